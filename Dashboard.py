@@ -3,16 +3,28 @@
 # ==============================================================================
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
 from pathlib import Path
 import os
-import re
-from typing import Optional, Tuple, Any
+from typing import Optional, Tuple
+
+from aggregates import CUBE_FLAG_COLS, ROWS_COL, level_values, slice_cube
+from charts import (Gauge, comparison_heatmap, gauge_figure, gauge_grid_figure, intention_gauges, rating_figure,
+                    score_gauges, trend_figure)
+from comments import PAGE_SIZE
+from compute import FilterSpec
+from profiling import TIMINGS, StageTimer, enabled as profiling_enabled
+from refresher import SnapshotRefresher
+from scoring import (OVERALL_COL, SATISFACTION_COLS, SATISFACTION_SCORE_COL, flag_column_name,
+                     score_column_name)
+from ingest import parse_sources, sheet_csv_url
+from snapshots import SNAPSHOT_PATH, SOURCE_CACHE_DIR
 
 # ==============================================================================
 # PAGE CONFIGURATION
 # ==============================================================================
 st.set_page_config(layout="wide", page_title="Patient Experience Program [IPD]")
+# เวลาของแต่ละขั้นตอนใน rerun นี้ (ดูได้ใน log 'mpx.timing' หรือแผง profiling ใน sidebar)
+rerun = StageTimer('rerun')
 
 # --- CSS & LOGO ---
 LOGO_URL = "https://raw.githubusercontent.com/HOIARRTool/hoiarr/main/logo1.png"
@@ -127,65 +139,46 @@ st.markdown("""
 # ==============================================================================
 # DATA LOADING
 # ==============================================================================
-@st.cache_data(ttl=300)
-def load_and_prepare_data(source: Any) -> pd.DataFrame:
-    if source is None:
-        return pd.DataFrame()
-    try:
-        if isinstance(source, str):
-            if source.lower().endswith('.xlsx'):
-                df = pd.read_excel(source)
-            else:
-                df = pd.read_csv(source)
-        else:
-            if source.name.lower().endswith('.xlsx'):
-                df = pd.read_excel(source)
-            else:
-                df = pd.read_csv(source)
-    except Exception as e:
-        # st.error(f"เกิดข้อผิดพลาดในการอ่านไฟล์ข้อมูล: {e}")
-        return pd.DataFrame()
-
-    # --- Data Cleaning ---
-    column_mapping = {
-        'หอผู้ป่วยที่ท่านเข้ารับบริการ/ ต้องการประเมิน \n(เพื่อสะท้อนกลับหน่วยงานโดยตรง)': 'หน่วยงาน',
-        'ส่วนที่ 1 ข้อมูลทั่วไปของผู้ตอบแบบประเมิน\n1. เพศ': 'เพศ',
-        '2. อายุ': 'อายุ', '3. ภูมิลำเนา': 'ภูมิลำเนา', '4. อาชีพ': 'อาชีพ', '5. สิทธิในการรักษา': 'สิทธิการรักษา',
-        '6. วันที่มารับบริการ': 'วันที่รับบริการ',
-        'จำนวนวันนอนรักษาที่โรงพยาบาล': 'วันนอน',
-        'ความพึงพอใจต่อบริการของโรงพยาบาลในภาพรวม': 'ความพึงพอใจโดยรวม',
-        '2. ท่านคิดว่าสุขภาพโดยรวมของท่าน (ณ ตอนนี้) เป็นอย่างไร': 'สุขภาพโดยรวม',
-        'แบบประเมิน [1. ขั้นตอนการติดต่อและเข้ารับการรักษาในโรงพยาบาล (Admissions) มีความสะดวกเพียงใด]': 'Q1_ความสะดวกการรับบริการ',
-        'แบบประเมิน [2. ขณะนอนโรงพยาบาลครั้งนี้ แพทย์ พยาบาลและเจ้าหน้าที่ รับฟังและเปิดโอกาสให้ท่านซักถามข้อสงสัยได้มากน้อยเพียงใด]': 'Q2_การรับฟัง',
-        'แบบประเมิน [3. ขณะนอนโรงพยาบาลครั้งนี้ แพทย์ พยาบาลและเจ้าหน้าที่ให้ข้อมูลเกี่ยวกับขั้นตอนการรับบริการได้ชัดเจนเพียงใด]': 'Q3_ความชัดเจนข้อมูลบริการ',
-        'แบบประเมิน [4. ขณะนอนโรงพยาบาล ท่านรู้สึกว่าบุคลากรทุกคนดูแลท่านอย่างเท่าเทียมและให้เกียรติหรือไม่]': 'Q4_ความเท่าเทียม',
-        'แบบประเมิน [5. โรงพยาบาลมีความสะอาด และมีสิ่งอำนวยความสะดวกเพียงพอต่อความต้องการของท่าน]': 'Q5_ความสะอาดและสิ่งอำนวยความสะดวก',
-        'แบบประเมิน [6. เมื่อท่านต้องการความช่วยเหลือ (เช่น กดปุ่มเรียกพยาบาล) ท่านได้รับตอบสนองอย่างเหมาะสม]': 'Q6_การตอบสนอง',
-        'แบบประเมิน [7. ขณะนอนโรงพยาบาล ท่านได้รับข้อมูลเกี่ยวกับค่าใช้จ่ายที่อาจเกิดขึ้นอย่างต่อเนื่องและชัดเจนเพียงใด]': 'Q7_ข้อมูลค่าใช้จ่าย',
-        'แบบประเมิน [8. ขณะนอนโรงพยาบาล ท่านได้รับข้อมูลการรักษา อาการแทรกซ้อนระหว่างการรักษาพยาบาล]': 'Q8_ข้อมูลการรักษา',
-        'แบบประเมิน [9. ท่านและครอบครัว ได้มีส่วนร่วมในการวางแผนการรักษาและการปฏิบัติตัวร่วมกับ ทีมผู้ให้การรักษาอย่างเหมาะสมหรือไม่]': 'Q9_การมีส่วนร่วมวางแผน',
-        'แบบประเมิน [10. ท่านได้รับข้อมูลยา ผลข้างเคียงของยา และวิธีการใช้ยาอย่างชัดเจนเพียงใด]': 'Q10_ข้อมูลด้านยา',
-        '1. หากท่านมีอาการเจ็บป่วย ท่านจะพิจารณากลับมารับบริการ ที่โรงพยาบาลแห่งนี้หรือไม่': 'กลับมารับบริการหรือไม่',
-        '2. หากมีโอกาสท่านจะแนะนำผู้อื่นให้มารับบริการที่โรงพยาบาลแห่งนี้หรือไม่': 'แนะนำผู้อื่นหรือไม่',
-        '3. ท่านมีความไม่พึงพอใจในการมาใช้บริการที่โรงพยาบาลนี้หรือไม่': 'มีความไม่พึงพอใจหรือไม่',
-        '(หากมี) ความไม่พึงพอใจกรุณาระบุรายละเอียด เพื่อเป็นประโยชน์ในการปรับปรุง': 'รายละเอียดความไม่พึงพอใจ',
-        'ข้อเสนอแนะเพิ่มเติมเพื่อการพัฒนาคุณภาพโรงพยาบาล': 'ความคาดหวังต่อบริการ'
-    }
-    df = df.rename(columns=lambda c: column_mapping.get(c.strip(), c.strip()))
-
-    if 'ประทับเวลา' in df.columns:
-        df['date_col'] = pd.to_datetime(df['ประทับเวลา'], dayfirst=True, errors='coerce')
-        df = df.dropna(subset=['date_col'])
-        df['เดือน'] = df['date_col'].dt.month
-        df['ไตรมาส'] = df['date_col'].dt.quarter
-        df['ปี'] = df['date_col'].dt.year
-    else:
-        df['date_col'] = pd.NaT
-        df['เดือน'] = None
-        df['ไตรมาส'] = None
-        df['ปี'] = None
-
-    return df
+REFRESH_INTERVAL = 300  # วินาที
+# gauge ของแต่ละส่วนรวมใน figure เดียว (MPX_GAUGE_MODE=single = หนึ่ง figure ต่อ gauge แบบเดิม)
+BATCHED_GAUGES = os.environ.get('MPX_GAUGE_MODE', 'batched') != 'single'
+
+@st.cache_resource
+def get_snapshot_refresher(source, fallback: Optional[str]) -> SnapshotRefresher:
+    # thread เดียวต่อ process เตรียมข้อมูลชุดถัดไปเบื้องหลัง ผู้ชมได้ชุดล่าสุดที่ใช้ได้เสมอ
+    return SnapshotRefresher(source, fallback=fallback, interval=REFRESH_INTERVAL,
+                             snapshot_path=SNAPSHOT_PATH, source_cache_dir=SOURCE_CACHE_DIR).start()
+
+def render_profile_panel(refresher: SnapshotRefresher, snapshot) -> None:
+    with st.sidebar.expander("⏱️ Profiling", expanded=True):
+        reruns = TIMINGS.recent('rerun')
+        st.caption(f"{len(reruns)} rerun ล่าสุด (มิลลิวินาที, ซ้าย = ล่าสุด)")
+        order = list(dict.fromkeys(k for r in reruns for k in r['stages']))  # เรียงตามลำดับในหน้า
+        table = pd.DataFrame({f"#{i + 1}": pd.Series(r['stages']) * 1e3 for i, r in enumerate(reruns)},
+                             index=order)
+        table.loc['รวม'] = [r['total'] * 1e3 for r in reruns]
+        st.dataframe(table.round(1), use_container_width=True)
+
+        refreshes = TIMINGS.recent('refresh')
+        if refreshes:
+            st.caption(f"การโหลดข้อมูลเบื้องหลัง {len(refreshes)} รอบล่าสุด (มิลลิวินาที)")
+            loads = pd.DataFrame([{'โหลด': r.get('load', '-'), 'แถวใหม่': r.get('new_rows', 0),
+                                   **{k: v * 1e3 for k, v in r['stages'].items()}, 'รวม': r['total'] * 1e3}
+                                  for r in refreshes])
+            st.dataframe(loads.round(1), use_container_width=True, hide_index=True)
+
+        st.caption("cache การโหลดต่อแหล่งข้อมูล (full = miss, unchanged = hit)")
+        stats = pd.DataFrame.from_dict(refresher.loader_stats(), orient='index')
+        st.dataframe(stats, use_container_width=True)
+        results = snapshot.results
+        st.caption(f"cache ผลคำนวณของ Snapshot นี้: hit {results.hits:,} · miss {results.misses:,} · "
+                   f"{len(results)} ชุดตัวกรอง")
+
+def format_age(seconds: float) -> str:
+    if seconds < 60: return "เมื่อสักครู่"
+    if seconds < 3600: return f"{int(seconds // 60)} นาทีที่แล้ว"
+    if seconds < 86400: return f"{int(seconds // 3600)} ชั่วโมงที่แล้ว"
+    return f"{int(seconds // 86400)} วันที่แล้ว"
 
 # ==============================================================================
 # MAIN APP LOGIC (Real-time Only)
@@ -195,24 +188,36 @@ def load_and_prepare_data(source: Any) -> pd.DataFrame:
 DATA_FILE = "mpxi.xlsx" # ไฟล์สำรอง
 SHEET_ID = '11DWvvit4Y50oO-7vebb6etXmvItBe-q1rJaOuezKs4A'
 SHEET_GID = '1977910889'
-GSHEET_URL = f"https://docs.google.com/spreadsheets/d/{SHEET_ID}/export?format=csv&gid={SHEET_GID}"
-
-df_original = pd.DataFrame()
-data_source_info = ""
+GSHEET_URL = sheet_csv_url(SHEET_ID, SHEET_GID)
+# แหล่งข้อมูลหลักหลายแหล่ง (ชีต/CSV/xlsx ของปีงบประมาณก่อน ๆ + ชีตปีปัจจุบัน) คั่นด้วย ';' ใน MPX_SOURCES
+# ใส่ชีตปีปัจจุบันไว้ท้ายสุด: แถวใหม่ของแหล่งสุดท้ายต่อท้ายข้อมูลรวมได้โดยไม่ต้องรวมใหม่ทั้งหมด
+DATA_SOURCES = tuple(parse_sources(os.environ.get('MPX_SOURCES', ''))) or GSHEET_URL
 
 # --- Load Data ---
-try:
-    df_original = load_and_prepare_data(GSHEET_URL)
-    if df_original.empty: raise Exception("Empty Data")
-    data_source_info = "Google Sheets (Real-time 🟢)"
-except Exception as e:
-    if os.path.exists(DATA_FILE):
-        df_original = load_and_prepare_data(DATA_FILE)
-        data_source_info = f"ไฟล์สำรอง: {DATA_FILE} (Offline)"
-        st.sidebar.warning(f"⚠️ เชื่อมต่อ Google Sheet ไม่ได้ ({e}) ระบบจึงแสดงผลข้อมูลจากไฟล์สำรองแทน")
-    else:
-        st.error(f"⚠️ ไม่สามารถดึงข้อมูลจาก Google Sheets และไม่พบไฟล์สำรอง: {e}")
-        st.stop()
+# ข้อมูลมาจาก Snapshot ที่ thread เบื้องหลังเตรียมไว้ (cold start ใช้ snapshot ไบนารีล่าสุดถ้ามี
+# ไม่เช่นนั้นครั้งแรกของ process จะรอการโหลดรอบแรก)
+with rerun.stage('snapshot'):
+    refresher = get_snapshot_refresher(DATA_SOURCES, DATA_FILE if os.path.exists(DATA_FILE) else None)
+    snapshot = refresher.current()
+
+if snapshot is None:
+    st.error(f"⚠️ ไม่สามารถดึงข้อมูลจาก Google Sheets และไม่พบไฟล์สำรอง: {refresher.last_error}")
+    st.stop()
+
+df_original = snapshot.frame
+cube = snapshot.cube
+if snapshot.is_fallback:
+    data_source_info = f"ไฟล์สำรอง: {snapshot.source} (Offline)"
+    st.sidebar.warning(f"⚠️ เชื่อมต่อ Google Sheet ไม่ได้ ({snapshot.error}) ระบบจึงแสดงผลข้อมูลจากไฟล์สำรองแทน")
+elif snapshot.source_errors:
+    # บางแหล่งโหลดไม่สำเร็จ: ไม่แสดงเป็น Real-time เพราะข้อมูลของแหล่งเหล่านั้นเป็นชุดก่อนหน้า
+    data_source_info = f"Google Sheets (บางแหล่งขัดข้อง 🟠) · อัปเดต {format_age(snapshot.age_seconds())}"
+    failed = "\n".join(f"- {src}: {err}" for src, err in snapshot.source_errors.items())
+    st.sidebar.warning(f"⚠️ โหลดแหล่งข้อมูลบางแหล่งไม่สำเร็จ ข้อมูลของแหล่งเหล่านี้เป็นชุดก่อนหน้า (หรือยังไม่มี)\n\n{failed}")
+else:
+    data_source_info = f"Google Sheets (Real-time 🟢) · อัปเดต {format_age(snapshot.age_seconds())}"
+    if snapshot.error:
+        st.sidebar.caption(f"⚠️ ดึงข้อมูลรอบล่าสุดไม่สำเร็จ ({snapshot.error}) กำลังแสดงข้อมูลชุดก่อนหน้า")
 
 if df_original.empty:
     st.warning("ไม่พบข้อมูลในระบบ")
@@ -245,35 +250,45 @@ st.sidebar.markdown(f"""
 """, unsafe_allow_html=True)
 
 # --- Filters ---
-st.sidebar.header("ตัวกรองข้อมูล (Filter)")
-available_departments = ['ภาพรวมทั้งหมด'] + sorted(df_original['หน่วยงาน'].dropna().unique().tolist())
-selected_department = st.sidebar.selectbox("เลือกหน่วยงาน:", available_departments)
-time_filter_option = st.sidebar.selectbox("เลือกช่วงเวลา:",
-                                          ["ทั้งหมด", "เลือกตามปี", "เลือกตามไตรมาส", "เลือกตามเดือน"])
-
-df_filtered = df_original.copy()
-if time_filter_option != "ทั้งหมด" and pd.notna(df_original['date_col']).any():
-    year_list = sorted(df_original['ปี'].dropna().unique().astype(int), reverse=True)
-    selected_year = st.sidebar.selectbox("เลือกปี:", year_list)
-    df_filtered = df_filtered[df_filtered['ปี'] == selected_year]
-
-    if time_filter_option in ["เลือกตามไตรมาส", "เลือกตามเดือน"]:
-        if time_filter_option == "เลือกตามไตรมาส":
-            quarter_list = sorted(df_filtered['ไตรมาส'].dropna().unique().astype(int))
-            selected_quarter = st.sidebar.selectbox("เลือกไตรมาส:", quarter_list)
-            df_filtered = df_filtered[df_filtered['ไตรมาส'] == selected_quarter]
-        elif time_filter_option == "เลือกตามเดือน":
-            month_map = {1: 'ม.ค.', 2: 'ก.พ.', 3: 'มี.ค.', 4: 'เม.ย.', 5: 'พ.ค.', 6: 'มิ.ย.', 7: 'ก.ค.', 8: 'ส.ค.',
-                         9: 'ก.ย.', 10: 'ต.ค.', 11: 'พ.ย.', 12: 'ธ.ค.'}
-            month_list = sorted(df_filtered['เดือน'].dropna().unique().astype(int))
-            selected_month_num = st.sidebar.selectbox("เลือกเดือน:", month_list,
-                                                      format_func=lambda x: month_map.get(x, x))
-            df_filtered = df_filtered[df_filtered['เดือน'] == selected_month_num]
-
-if selected_department != 'ภาพรวมทั้งหมด':
-    df_filtered = df_filtered[df_filtered['หน่วยงาน'] == selected_department]
-
-if df_filtered.empty:
+with rerun.stage('filter'):
+    st.sidebar.header("ตัวกรองข้อมูล (Filter)")
+    available_departments = ['ภาพรวมทั้งหมด'] + sorted(level_values(cube, 'หน่วยงาน'))
+    selected_department = st.sidebar.selectbox("เลือกหน่วยงาน:", available_departments)
+    time_filter_option = st.sidebar.selectbox("เลือกช่วงเวลา:",
+                                              ["ทั้งหมด", "เลือกตามปี", "เลือกตามไตรมาส", "เลือกตามเดือน"])
+
+    period_filter = {}
+    if time_filter_option != "ทั้งหมด" and level_values(cube, 'ปี'):
+        year_list = sorted((int(y) for y in level_values(cube, 'ปี')), reverse=True)
+        selected_year = st.sidebar.selectbox("เลือกปี:", year_list)
+        period_filter['year'] = selected_year
+
+        if time_filter_option in ["เลือกตามไตรมาส", "เลือกตามเดือน"]:
+            year_cells = slice_cube(cube, year=selected_year)
+            if time_filter_option == "เลือกตามไตรมาส":
+                quarter_list = sorted(int(q) for q in level_values(year_cells, 'ไตรมาส'))
+                selected_quarter = st.sidebar.selectbox("เลือกไตรมาส:", quarter_list)
+                period_filter['quarter'] = selected_quarter
+            elif time_filter_option == "เลือกตามเดือน":
+                month_map = {1: 'ม.ค.', 2: 'ก.พ.', 3: 'มี.ค.', 4: 'เม.ย.', 5: 'พ.ค.', 6: 'มิ.ย.', 7: 'ก.ค.', 8: 'ส.ค.',
+                             9: 'ก.ย.', 10: 'ต.ค.', 11: 'พ.ย.', 12: 'ธ.ค.'}
+                month_list = sorted(int(m) for m in level_values(year_cells, 'เดือน'))
+                selected_month_num = st.sidebar.selectbox("เลือกเดือน:", month_list,
+                                                          format_func=lambda x: month_map.get(x, x))
+                period_filter['month'] = selected_month_num
+
+    department_filter = selected_department if selected_department != 'ภาพรวมทั้งหมด' else None
+
+    # ค้นหาในความคิดเห็น (ตามหน่วยงาน/ช่วงเวลาที่เลือก) ด้วยดัชนีของ Snapshot
+    comment_query = st.sidebar.text_input("ค้นหาในความคิดเห็น:", placeholder="เช่น เสียงดัง, กดปุ่มเรียก, ยา").strip()
+
+# ตัวเลขทั้งหมดของหน้านี้มาจาก compute layer (memoize ต่อชุดตัวกรองใน Snapshot)
+cache_hits = snapshot.results.hits
+with rerun.stage('compute'):
+    result = snapshot.dashboard(FilterSpec(department=department_filter, **period_filter))
+rerun.info['result_cache'] = 'hit' if snapshot.results.hits > cache_hits else 'miss'
+
+if result.empty:
     st.warning("ไม่พบข้อมูลตามตัวกรองที่ท่านเลือก")
     st.stop()
 
@@ -283,19 +298,6 @@ if df_filtered.empty:
 st.title(f"DASHBOARD: {selected_department}")
 
 # --- Helpers ---
-LIKERT_MAP = {'มากที่สุด': 5, 'มาก': 4, 'ปานกลาง': 3, 'น้อย': 2, 'น้อยมาก': 1,
-              ' มากที่สุด': 5, ' มาก': 4, ' ปานกลาง': 3, ' น้อย': 2, ' น้อยมาก': 1}
-
-def normalize_to_1_5(x):
-    if pd.isna(x): return pd.NA
-    s = str(x).strip()
-    if s in LIKERT_MAP: return LIKERT_MAP[s]
-    m = re.search(r'([1-5])', s)
-    if m: return int(m.group(1))
-    for k, v in LIKERT_MAP.items():
-        if k.strip() in s: return v
-    return pd.NA
-
 def render_average_heart_rating(avg_score, max_score=5, responses=None):
     if pd.isna(avg_score):
         st.info("ยังไม่มีคะแนนเฉลี่ยให้แสดง")
@@ -312,53 +314,54 @@ def render_average_heart_rating(avg_score, max_score=5, responses=None):
     labels_html = "".join([f'<span class="heart-label">{i}</span>' for i in range(1, max_score + 1)])
     st.markdown(f"""<style>.heart-wrap {{ width: 100%; border: 1px solid #eee; border-radius: 12px; padding: 16px; background: #fff; }} .heart {{ font-size: 40px; color: #E6E6E6; }} .heart.full {{ color: #e02424; }} .heart-labels {{ display: grid; grid-template-columns: repeat(5, 1fr); margin-top: 6px; color: #6b7280; text-align: center; }}</style><div class="heart-wrap"><div style="font-weight:600;margin-bottom:10px;">Average rating ({avg_score:.2f})</div><div>{hearts_html}</div><div class="heart-labels">{labels_html}</div>{"<div style='color:#6b7280;font-size:0.9rem;margin-top:6px;'>คำตอบ " + f"{responses:,}" + " ข้อ</div>" if responses else ""}</div>""", unsafe_allow_html=True)
 
-def plot_gauge_1_5(series_num, title, height=200, key=None):
-    s = series_num.dropna()
-    if s.empty:
+def plot_gauge_1_5(avg, n, title, height=200, key=None):
+    if n == 0:
         st.info(f"ไม่มีข้อมูลสำหรับ '{title}'")
         return
-    avg = float(s.mean()); n = int(s.size)
     st.markdown(f"<div class='gauge-head'>{title}</div><div class='gauge-sub'>n = {n}</div>", unsafe_allow_html=True)
-    steps = [{'range': [1, 2], 'color': '#DC2626'}, {'range': [2, 3], 'color': '#EA580C'}, {'range': [3, 4], 'color': '#F59E0B'}, {'range': [4, 5], 'color': '#16A34A'}]
-    fig = go.Figure(go.Indicator(mode="gauge+number", value=avg, number={'valueformat': '.2f'}, gauge={'axis': {'range': [1, 5]}, 'bar': {'color': '#111827'}, 'steps': steps, 'threshold': {'line': {'color': '#111827', 'width': 2}, 'thickness': 0.6, 'value': avg}}))
-    fig.update_layout(margin=dict(t=10,b=10,l=10,r=10), height=height)
-    st.plotly_chart(fig, use_container_width=True, key=key)
+    with rerun.stage(f"chart:{key}"):
+        st.plotly_chart(gauge_figure(Gauge(title, avg, n), height=height), use_container_width=True, key=key)
 
 def render_percent_gauge(title, pct, n, height=200, key=None, mode='high_good'):
     st.markdown(f"<div class='gauge-head'>{title}</div><div class='gauge-sub'>n = {n}</div>", unsafe_allow_html=True)
-    colors = ['#DC2626', '#EA580C', '#F59E0B', '#16A34A'] if mode == 'high_good' else ['#16A34A', '#F59E0B', '#EA580C', '#DC2626']
-    ranges = [[0, 50], [50, 65], [65, 80], [80, 100]] if mode == 'high_good' else [[0, 5], [5, 10], [10, 20], [20, 100]]
-    steps = [{'range': r, 'color': c} for r, c in zip(ranges, colors)]
-    fig = go.Figure(go.Indicator(mode="gauge+number", value=float(pct), number={'suffix': '%', 'valueformat': '.1f'}, gauge={'axis': {'range': [0, 100]}, 'bar': {'color': '#111827'}, 'steps': steps, 'threshold': {'line': {'color': '#111827', 'width': 2}, 'thickness': 0.6, 'value': float(pct)}}))
-    fig.update_layout(margin=dict(t=10,b=10,l=10,r=10), height=height)
-    st.plotly_chart(fig, use_container_width=True, key=key)
-
-def percent_positive(series, positives=("ใช่",)):
-    s = series.dropna().astype(str).str.strip()
-    if s.empty: return 0.0, 0
-    return (s.isin(positives).sum() / s.size) * 100.0, s.size
-
-def plot_rating_distribution(series_likert, title, key):
-    s = series_likert.apply(normalize_to_1_5).dropna().astype(int)
-    if s.empty: return
-    rc = s.value_counts().reindex([1,2,3,4,5], fill_value=0).reset_index()
-    rc.columns = ['คะแนน', 'จำนวน']
-    fig = go.Figure(go.Bar(x=rc['คะแนน'], y=rc['จำนวน'], text=rc['จำนวน'], textposition='auto', marker_color=['#DC2626','#EA580C','#F59E0B','#22C55E','#16A34A']))
-    fig.update_layout(title=title, height=280, margin=dict(t=40,b=40,l=40,r=40))
-    st.plotly_chart(fig, use_container_width=True, key=key)
-
-# --- Metrics Calc ---
-satisfaction_score_map = {'มากที่สุด': 5, 'มาก': 4, 'ปานกลาง': 3, 'น้อย': 2, 'น้อยมาก': 1}
-df_filtered['คะแนนความพึงพอใจ'] = df_filtered['ความพึงพอใจโดยรวม'].map(satisfaction_score_map)
-average_satisfaction_score = df_filtered['คะแนนความพึงพอใจ'].mean()
+    with rerun.stage(f"chart:{key}"):
+        fig = gauge_figure(Gauge(title, pct, n, kind='percent', mode=mode), height=height)
+        st.plotly_chart(fig, use_container_width=True, key=key)
+
+def render_gauge_grid(gauges, columns, key):
+    # ทุก gauge ของส่วนนี้ใน st.plotly_chart เดียว (ดู charts.gauge_grid_figure)
+    with rerun.stage(f"chart:{key}"):
+        st.plotly_chart(gauge_grid_figure(gauges, columns=columns), use_container_width=True, key=key)
+
+def plot_rating_distribution(score_counts, title, key):
+    if score_counts.sum() == 0: return
+    with rerun.stage(f"chart:{key}"):
+        st.plotly_chart(rating_figure(score_counts, title), use_container_width=True, key=key)
+
+def render_comment_table(comments, name):
+    # ส่งข้อความให้เบราว์เซอร์ทีละหน้า (PAGE_SIZE แถว) ไม่ว่าข้อมูลจะสะสมมากี่ปี
+    pages = comments.page_count()
+    page = 1
+    if pages > 1:
+        # key ผูกกับตัวกรอง/คำค้น: เปลี่ยนแล้วกลับไปหน้าแรก
+        page = int(st.number_input(f"หน้า (ทั้งหมด {pages:,} หน้า)", min_value=1, max_value=pages, value=1,
+                                   step=1, key=f"page_{name}_{result.spec}_{comment_query}"))
+    with rerun.stage(f"table:{name}"):
+        st.dataframe(comments.page(df_original, page), use_container_width=True, hide_index=True)
+    if pages > 1:
+        start = (page - 1) * PAGE_SIZE
+        st.caption(f"รายการที่ {start + 1:,}–{min(start + PAGE_SIZE, len(comments)):,} จาก {len(comments):,} รายการ")
+
+# --- Metrics (จาก DashboardResult) ---
+average_satisfaction_score = result.avg_satisfaction
 display_avg_satisfaction = f"{average_satisfaction_score:.2f}" if pd.notna(average_satisfaction_score) else "N/A"
-total_responses = len(df_filtered)
+total_responses = result.total_responses
 
-return_service_pct, _ = percent_positive(df_filtered['กลับมารับบริการหรือไม่'])
-recommend_pct, _ = percent_positive(df_filtered['แนะนำผู้อื่นหรือไม่'])
-dissatisfied_pct, _ = percent_positive(df_filtered['มีความไม่พึงพอใจหรือไม่'], positives=("มี",))
+return_service_pct, return_service_n = result.intentions['กลับมารับบริการหรือไม่']
+recommend_pct, recommend_n = result.intentions['แนะนำผู้อื่นหรือไม่']
+dissatisfied_pct, dissatisfied_n = result.intentions['มีความไม่พึงพอใจหรือไม่']
 
-most_common_health_status = df_filtered['สุขภาพโดยรวม'].mode()[0] if 'สุขภาพโดยรวม' in df_filtered.columns and not df_filtered['สุขภาพโดยรวม'].dropna().empty else "N/A"
+most_common_health_status = result.health_mode or "N/A"
 
 # --- Layout ---
 st.markdown("##### ภาพรวม")
@@ -373,68 +376,116 @@ r2c2.markdown(f'<div class="metric-box metric-box-4"><div class="label">% กา
 r2c3.markdown(f'<div class="metric-box metric-box-5"><div class="label">% ไม่พึงพอใจ</div><div class="value">{dissatisfied_pct:.1f}%</div></div>', unsafe_allow_html=True)
 st.markdown("---")
 
-if selected_department == 'ภาพรวมทั้งหมด':
+if result.responses_by_department is not None:
     st.subheader("สรุปจำนวนการประเมินตามหน่วยงาน")
-    st.dataframe(df_filtered['หน่วยงาน'].value_counts().reset_index().rename(columns={'index':'หน่วยงาน', 'หน่วยงาน':'จำนวน'}), use_container_width=True, hide_index=True)
+    with rerun.stage('table:departments'):
+        st.dataframe(result.responses_by_department, use_container_width=True, hide_index=True)
     st.markdown("---")
 
 st.subheader("ความพึงพอใจโดยรวม")
 c_left, c_right = st.columns([1, 1])
 with c_left: render_average_heart_rating(average_satisfaction_score, max_score=5, responses=total_responses)
-with c_right: plot_rating_distribution(df_filtered['ความพึงพอใจโดยรวม'], "Distribution ของคะแนน (1–5)", key="dist_overall_ipd")
+with c_right: plot_rating_distribution(result.overall_histogram, "Distribution ของคะแนน (1–5)", key="dist_overall_ipd")
 st.markdown("---")
 
 st.header("ส่วนที่ 2: ความพึงพอใจต่อบริการ (รายหัวข้อ)")
-satisfaction_cols = {
-    'Q1_ความสะดวกการรับบริการ': '1. ความสะดวกในการติดต่อและเข้ารับบริการ',
-    'Q2_การรับฟัง': '2. การรับฟังและเปิดโอกาสให้ซักถาม',
-    'Q3_ความชัดเจนข้อมูลบริการ': '3. ความชัดเจนของข้อมูลขั้นตอนบริการ',
-    'Q4_ความเท่าเทียม': '4. การดูแลอย่างเท่าเทียมและให้เกียรติ',
-    'Q5_ความสะอาดและสิ่งอำนวยความสะดวก': '5. ความสะอาดและสิ่งอำนวยความสะดวก',
-    'Q6_การตอบสนอง': '6. การตอบสนองเมื่อต้องการความช่วยเหลือ',
-    'Q7_ข้อมูลค่าใช้จ่าย': '7. ความชัดเจนของข้อมูลค่าใช้จ่าย',
-    'Q8_ข้อมูลการรักษา': '8. การได้รับข้อมูลการรักษาและอาการแทรกซ้อน',
-    'Q9_การมีส่วนร่วมวางแผน': '9. การมีส่วนร่วมในการวางแผนการรักษา',
-    'Q10_ข้อมูลด้านยา': '10. ความชัดเจนของข้อมูลด้านยา'
-}
-for col in satisfaction_cols.keys():
-    if col in df_filtered.columns:
-        df_filtered[f'{col}__score'] = df_filtered[col].apply(normalize_to_1_5).astype('Float64')
-
-col_pairs = [list(satisfaction_cols.items())[i:i + 2] for i in range(0, len(satisfaction_cols), 2)]
-for pair in col_pairs:
-    cols = st.columns(2)
-    for i, (col_name, title) in enumerate(pair):
-        with cols[i]:
-            score_col = f'{col_name}__score'
-            if score_col in df_filtered.columns:
-                plot_gauge_1_5(df_filtered[score_col], title, height=200, key=f"g_{col_name}")
+if BATCHED_GAUGES:
+    render_gauge_grid(score_gauges(result.question_scores), columns=2, key="g_section2")
+else:
+    satisfaction_cols = SATISFACTION_COLS
+    col_pairs = [list(satisfaction_cols.items())[i:i + 2] for i in range(0, len(satisfaction_cols), 2)]
+    for pair in col_pairs:
+        cols = st.columns(2)
+        for i, (col_name, title) in enumerate(pair):
+            with cols[i]:
+                avg, n = result.question_scores[col_name]
+                plot_gauge_1_5(avg, n, title, height=200, key=f"g_{col_name}")
 
 st.markdown("---")
 st.header("ส่วนที่ 3: ความตั้งใจในอนาคตและข้อเสนอแนะ")
-c1, c2, c3 = st.columns(3)
-with c1:
-    p1, n1 = percent_positive(df_filtered['กลับมารับบริการหรือไม่'], positives=("ใช่",))
-    render_percent_gauge("1. กลับมารับบริการ (ใช่)", p1, n1, key="gf1")
-with c2:
-    p2, n2 = percent_positive(df_filtered['แนะนำผู้อื่นหรือไม่'], positives=("ใช่",))
-    render_percent_gauge("2. แนะนำผู้อื่น (ใช่)", p2, n2, key="gf2")
-with c3:
-    p3, n3 = percent_positive(df_filtered['มีความไม่พึงพอใจหรือไม่'], positives=("มี",))
-    render_percent_gauge("3. ไม่พึงพอใจ (มี)", p3, n3, key="gf3", mode='low_good')
+if BATCHED_GAUGES:
+    render_gauge_grid(intention_gauges(result.intentions), columns=3, key="g_section3")
+else:
+    for col, g, key in zip(st.columns(3), intention_gauges(result.intentions), ["gf1", "gf2", "gf3"]):
+        with col:
+            render_percent_gauge(g.title, g.value, g.n, key=key, mode=g.mode)
+
+complaints, suggestions = result.complaints, result.suggestions
+if comment_query:
+    with rerun.stage('search'):
+        if complaints is not None: complaints = snapshot.search_comments(comment_query, complaints)
+        if suggestions is not None: suggestions = snapshot.search_comments(comment_query, suggestions)
+    found = sum(len(c) for c in (complaints, suggestions) if c is not None)
+    st.info(f"🔍 ความคิดเห็นที่มีคำว่า “{comment_query}”: {found:,} รายการ")
 
 st.subheader("รายละเอียดความไม่พึงพอใจ (หากมี)")
-if 'รายละเอียดความไม่พึงพอใจ' in df_filtered.columns:
-    det = df_filtered[df_filtered['รายละเอียดความไม่พึงพอใจ'].notna()]
-    det = det[~det['รายละเอียดความไม่พึงพอใจ'].astype(str).str.strip().isin(['', 'ไม่มี', '-', 'nan'])]
-    if not det.empty: st.dataframe(det[['หน่วยงาน', 'รายละเอียดความไม่พึงพอใจ']], use_container_width=True, hide_index=True)
+if complaints is not None:
+    if not complaints.empty: render_comment_table(complaints, "complaints")
     else: st.info("ไม่พบรายละเอียดความไม่พึงพอใจ")
 
 st.subheader("ความคาดหวังต่อบริการ")
-target_col = 'ความคาดหวังต่อบริการของโรงพยาบาลในภาพรวม'
-if target_col not in df_filtered.columns and 'ความคาดหวังต่อบริการ' in df_filtered.columns: target_col = 'ความคาดหวังต่อบริการ'
-if target_col in df_filtered.columns:
-    sug = df_filtered[df_filtered[target_col].notna()]
-    if not sug.empty: st.dataframe(sug[['หน่วยงาน', target_col]], use_container_width=True, hide_index=True)
+if suggestions is not None:
+    if not suggestions.empty: render_comment_table(suggestions, "suggestions")
     else: st.info("ไม่พบข้อมูลความคาดหวัง")
 
+st.markdown("---")
+st.header("ส่วนที่ 4: แนวโน้มตามช่วงเวลา")
+st.caption("ทุกช่วงเวลาของข้อมูล ตามหน่วยงานที่เลือก (ไม่ขึ้นกับตัวกรองปี/ไตรมาส/เดือน)")
+t1, t2 = st.columns([1, 2])
+trend_freq = {'รายเดือน': 'M', 'รายสัปดาห์': 'W'}[t1.radio("ความถี่:", ['รายเดือน', 'รายสัปดาห์'], horizontal=True)]
+trend_window = t2.select_slider("ค่าเฉลี่ยเคลื่อนที่ (จำนวนช่วง):", [1, 2, 3, 4, 6, 8, 12], value=1)
+with rerun.stage('trend'):
+    trend = snapshot.trend(trend_freq, department_filter, trend_window)
+if trend.empty:
+    st.info("ไม่มีข้อมูลสำหรับแสดงแนวโน้ม")
+else:
+    with rerun.stage('chart:trend'):
+        st.plotly_chart(trend_figure(trend, SATISFACTION_SCORE_COL), use_container_width=True, key="trend")
+
+if department_filter is None:
+    # ตัวชี้วัดของทุกหน่วยงานจาก groupby ครั้งเดียวบน cube (memoize ต่อช่วงเวลาใน Snapshot)
+    st.markdown("---")
+    st.header("ส่วนที่ 5: เปรียบเทียบหน่วยงาน")
+    st.caption("ทุกหน่วยงาน ตามช่วงเวลาที่เลือก")
+    compare_metrics = {
+        SATISFACTION_SCORE_COL: 'คะแนนพึงพอใจเฉลี่ย',
+        **{score_column_name(c): c.split('_')[0] for c in SATISFACTION_COLS},
+        score_column_name(OVERALL_COL): 'โดยรวม',
+        flag_column_name('กลับมารับบริการหรือไม่'): '% กลับมาใช้บริการ',
+        flag_column_name('แนะนำผู้อื่นหรือไม่'): '% การบอกต่อ',
+        flag_column_name('มีความไม่พึงพอใจหรือไม่'): '% ไม่พึงพอใจ',
+    }
+    k1, k2 = st.columns([2, 1])
+    compare_sort = k1.selectbox("เรียงตาม (น้อยไปมาก):", list(compare_metrics.values()))
+    compare_ci = k2.checkbox("แสดงช่วงความเชื่อมั่น 95%")
+    with rerun.stage('compare'):
+        comparison = snapshot.compare(result.spec, ci=compare_ci)
+        metrics = [c for c in compare_metrics if c in comparison.columns.get_level_values(0)]
+        sort_col = next(c for c, label in compare_metrics.items() if label == compare_sort)
+        if sort_col in metrics:
+            comparison = comparison.sort_values((sort_col, 'mean'), na_position='last')
+    question_cols = [score_column_name(c) for c in SATISFACTION_COLS if score_column_name(c) in metrics]
+    with rerun.stage('chart:compare'):
+        means = comparison.xs('mean', axis=1, level=1)[question_cols].rename(columns=compare_metrics)
+        counts = comparison.xs('n', axis=1, level=1)[question_cols].fillna(0).astype(int)
+        st.plotly_chart(comparison_heatmap(means, counts), use_container_width=True, key="compare")
+    with rerun.stage('table:compare'):
+        table = pd.DataFrame({'จำนวนผู้ตอบ': comparison[(ROWS_COL, 'n')]})
+        for col in metrics:
+            digits = 1 if col in CUBE_FLAG_COLS else 2
+            mean = comparison[(col, 'mean')].round(digits)
+            if compare_ci:
+                low, high = comparison[(col, 'low')], comparison[(col, 'high')]
+                mean = mean.map(lambda v: f"{v:.{digits}f}" if pd.notna(v) else "") + [
+                    f" ({lo:.{digits}f}–{hi:.{digits}f})" if pd.notna(lo) else "" for lo, hi in zip(low, high)]
+            table[compare_metrics[col]] = mean
+        st.dataframe(table.rename_axis('หน่วยงาน').reset_index(), use_container_width=True, hide_index=True)
+
+# ==============================================================================
+# PROFILING (เปิดด้วย ?profile=1 หรือ MPX_PROFILE=1)
+# ==============================================================================
+rerun.info.update(department=department_filter, **period_filter)
+TIMINGS.add(rerun)
+if profiling_enabled(st.query_params):
+    render_profile_panel(refresher, snapshot)
+
@@ -0,0 +1,256 @@
+# ==============================================================================
+# AGGREGATE CUBE (หน่วยงาน × ปี × ไตรมาส × เดือน)
+# ==============================================================================
+# สร้างครั้งเดียวต่อการโหลดข้อมูล: แต่ละแถวของ cube คือหนึ่งช่อง หน่วยงาน/ช่วงเวลา
+# เก็บผลรวม จำนวน และฮิสโตแกรมคะแนน 1-5 ของทุกคอลัมน์คะแนน ตัวเลขบน Dashboard
+# (KPI, gauge, distribution) จึงได้จากการรวมไม่กี่แถวของ cube แทนการคำนวณจากข้อมูลดิบ
+from statistics import NormalDist
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from scoring import (INTENTION_COLS, LIKERT_COLUMNS, SATISFACTION_SCORE_COL, flag_column_name,
+                     score_column_name)
+
+CUBE_KEYS = ['หน่วยงาน', 'ปี', 'ไตรมาส', 'เดือน']
+ROWS_COL = 'n_rows'
+HEALTH_COL = 'สุขภาพโดยรวม'
+SCORE_LEVELS = [1, 2, 3, 4, 5]
+
+# คอลัมน์คะแนน 1-5 ที่ cube เก็บไว้ (ตามชื่อคอลัมน์ที่ add_score_columns สร้าง)
+CUBE_SCORE_COLS = [score_column_name(c) for c in LIKERT_COLUMNS] + [SATISFACTION_SCORE_COL]
+CUBE_FLAG_COLS = [flag_column_name(c) for c in INTENTION_COLS]
+
+
+def sum_column_name(col: str) -> str:
+    return f'{col}__sum'
+
+
+def count_column_name(col: str) -> str:
+    return f'{col}__n'
+
+
+def hist_column_name(col: str, level: int) -> str:
+    return f'{col}__h{level}'
+
+
+def category_column_name(col: str, value: str) -> str:
+    return f'{col}=={value}'
+
+
+def _cell_parts(df: pd.DataFrame, score_cols: List[str], histograms: bool,
+                categories: bool) -> Dict[str, np.ndarray]:
+    # คอลัมน์นับ/ผลรวมต่อแถว (ยังไม่รวมกลุ่ม) ของ build_cube และ build_trend
+    parts: Dict[str, np.ndarray] = {ROWS_COL: np.ones(len(df), dtype=np.int32)}
+    for col in score_cols:
+        if col not in df.columns:
+            continue
+        values = df[col].to_numpy(dtype=np.int16, na_value=0)
+        parts[sum_column_name(col)] = values.astype(np.int32)
+        parts[count_column_name(col)] = (values != 0).astype(np.int32)
+        if histograms:
+            for level in SCORE_LEVELS:
+                parts[hist_column_name(col, level)] = (values == level).astype(np.int32)
+    for col in CUBE_FLAG_COLS:
+        if col not in df.columns:
+            continue
+        flags = df[col].array
+        parts[sum_column_name(col)] = flags.to_numpy(dtype=bool, na_value=False).astype(np.int32)
+        parts[count_column_name(col)] = (~flags.isna()).astype(np.int32)
+    if categories and HEALTH_COL in df.columns:
+        codes, uniques = pd.factorize(df[HEALTH_COL], use_na_sentinel=True)
+        for i, value in enumerate(uniques):
+            parts[category_column_name(HEALTH_COL, str(value))] = (codes == i).astype(np.int32)
+    return parts
+
+
+def build_cube(df: pd.DataFrame) -> pd.DataFrame:
+    """รวมข้อมูลที่ผ่าน ingest.prepare_frame แล้วเป็น cube ตาม CUBE_KEYS
+
+    คอลัมน์ของ cube:
+    - 'n_rows': จำนวนผู้ตอบในช่อง
+    - '<คะแนน>__sum', '<คะแนน>__n', '<คะแนน>__h1'..'__h5': ผลรวม จำนวน และฮิสโตแกรมของคะแนน
+    - '<flag>__sum', '<flag>__n': จำนวนคำตอบ "บวก" และจำนวนคำตอบทั้งหมด
+    - 'สุขภาพโดยรวม==<คำตอบ>': จำนวนคำตอบแต่ละแบบ (ใช้หา mode)
+    """
+    keys = [k for k in CUBE_KEYS if k in df.columns]
+    frame = pd.DataFrame(_cell_parts(df, CUBE_SCORE_COLS, histograms=True, categories=True), index=df.index)
+    if not keys:
+        return frame.sum().to_frame().T
+    return frame.groupby([df[k] for k in keys], dropna=False, observed=True, sort=True).sum()
+
+
+def slice_cube(cube: pd.DataFrame, department: Optional[str] = None, year: Optional[int] = None,
+               quarter: Optional[int] = None, month: Optional[int] = None) -> pd.DataFrame:
+    """เลือกช่องของ cube ตามตัวกรอง (None = ไม่กรองระดับนั้น)"""
+    mask = np.ones(len(cube), dtype=bool)
+    for key, value in zip(CUBE_KEYS, (department, year, quarter, month)):
+        if value is not None and key in cube.index.names:
+            mask &= (cube.index.get_level_values(key) == value)
+    return cube[mask]
+
+
+def filter_rows(frame: pd.DataFrame, department: Optional[str] = None, year: Optional[int] = None,
+                quarter: Optional[int] = None, month: Optional[int] = None) -> np.ndarray:
+    """ตำแหน่งแถวของข้อมูลรายแถวที่ตรงกับตัวกรองเดียวกับ slice_cube (ไม่คัดลอกข้อมูล)"""
+    mask = np.ones(len(frame), dtype=bool)
+    for key, value in zip(CUBE_KEYS, (department, year, quarter, month)):
+        if value is not None and key in frame.columns:
+            mask &= (frame[key] == value).to_numpy(dtype=bool, na_value=False)
+    return np.flatnonzero(mask)
+
+
+def take_rows(frame: pd.DataFrame, rows: np.ndarray, columns: List[str]) -> pd.DataFrame:
+    """ดึงเฉพาะคอลัมน์ที่ต้องแสดงของแถวที่เลือก (ไม่คัดลอกคอลัมน์อื่นของทั้งตาราง)"""
+    return frame.iloc[rows, frame.columns.get_indexer(columns)]
+
+
+def total(cells: pd.DataFrame) -> pd.Series:
+    """รวมช่องที่เลือกเป็นแถวเดียว"""
+    return cells.sum()
+
+
+def score_mean(tot: pd.Series, col: str) -> Tuple[float, int]:
+    """(ค่าเฉลี่ย, n) ของคอลัมน์คะแนน; ค่าเฉลี่ยเป็น NaN เมื่อไม่มีคะแนน"""
+    n = int(tot.get(count_column_name(col), 0))
+    if n == 0:
+        return float('nan'), 0
+    return float(tot[sum_column_name(col)]) / n, n
+
+
+def score_histogram(tot: pd.Series, col: str) -> pd.Series:
+    """จำนวนคะแนน 1-5 ของคอลัมน์คะแนน (index = คะแนน)"""
+    return pd.Series([int(tot.get(hist_column_name(col, level), 0)) for level in SCORE_LEVELS],
+                     index=SCORE_LEVELS)
+
+
+def flag_percent(tot: pd.Series, col: str) -> Tuple[float, int]:
+    """(% คำตอบบวก, n) ของคอลัมน์ flag ให้ผลเหมือน percent_positive"""
+    n = int(tot.get(count_column_name(col), 0))
+    if n == 0:
+        return 0.0, 0
+    return (int(tot[sum_column_name(col)]) / n) * 100.0, n
+
+
+def category_mode(tot: pd.Series, col: str):
+    """คำตอบที่พบบ่อยที่สุด (เสมอกันเลือกตัวที่เรียงก่อน เหมือน Series.mode()[0]), None เมื่อไม่มีคำตอบ"""
+    prefix = category_column_name(col, '')
+    counts = {k[len(prefix):]: int(v) for k, v in tot.items() if k.startswith(prefix) and v > 0}
+    if not counts:
+        return None
+    best = max(counts.values())
+    return sorted(k for k, v in counts.items() if v == best)[0]
+
+
+def compare_levels(cells: pd.DataFrame, key: str = 'หน่วยงาน', ci: bool = False,
+                   confidence: float = 0.95) -> pd.DataFrame:
+    """ตัวชี้วัดของทุกค่าในระดับ key (เช่น ทุกหน่วยงาน) จาก groupby ครั้งเดียวบน cells
+
+    index = ค่าของ key ที่มีผู้ตอบ, คอลัมน์ MultiIndex (ตัวชี้วัด, ค่า):
+    - (ROWS_COL, 'n'): จำนวนผู้ตอบ
+    - (<คะแนน>, 'mean' | 'n'): ค่าเฉลี่ยคะแนน 1-5 ของทุกคอลัมน์ใน CUBE_SCORE_COLS
+    - (<flag>, 'mean' | 'n'): % คำตอบบวกของทุกคอลัมน์ใน CUBE_FLAG_COLS
+    ci=True เพิ่ม 'low'/'high': ช่วงความเชื่อมั่นของค่าเฉลี่ย (normal approx. ความแปรปรวนจากฮิสโตแกรม)
+    และของสัดส่วน (Wilson score interval) ค่าที่ n = 0 เป็น NaN
+    """
+    g = cells.groupby(level=key, observed=True, sort=True).sum()
+    g = g[g[ROWS_COL] > 0]
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    out = {(ROWS_COL, 'n'): g[ROWS_COL]}
+    for col in CUBE_SCORE_COLS:
+        if sum_column_name(col) not in g.columns:
+            continue
+        n, total_ = g[count_column_name(col)], g[sum_column_name(col)]
+        nz = n.where(n > 0)
+        mean = total_ / nz
+        out[(col, 'mean')], out[(col, 'n')] = mean, n
+        if ci:
+            sumsq = sum(level * level * g[hist_column_name(col, level)] for level in SCORE_LEVELS)
+            var = (sumsq - total_ * total_ / nz) / (nz - 1).where(nz > 1)
+            half = z * np.sqrt(var.clip(lower=0) / nz)
+            out[(col, 'low')], out[(col, 'high')] = mean - half, mean + half
+    for col in CUBE_FLAG_COLS:
+        if sum_column_name(col) not in g.columns:
+            continue
+        n = g[count_column_name(col)]
+        nz = n.where(n > 0)
+        p = g[sum_column_name(col)] / nz
+        out[(col, 'mean')], out[(col, 'n')] = p * 100.0, n
+        if ci:
+            denom = 1 + z * z / nz
+            center = (p + z * z / (2 * nz)) / denom
+            half = z * np.sqrt(p * (1 - p) / nz + z * z / (4 * nz * nz)) / denom
+            out[(col, 'low')], out[(col, 'high')] = (center - half) * 100.0, (center + half) * 100.0
+    table = pd.DataFrame(out)
+    table.columns = pd.MultiIndex.from_tuples(table.columns, names=['ตัวชี้วัด', 'ค่า'])
+    return table
+
+
+def level_values(cells: pd.DataFrame, key: str) -> List:
+    """ค่าที่มีข้อมูลของระดับ key ใน cells (ไม่รวมค่าว่าง)"""
+    if key not in cells.index.names:
+        return []
+    return cells.index.get_level_values(key).dropna().unique().tolist()
+
+
+def rows_by_level(cells: pd.DataFrame, key: str) -> pd.Series:
+    """จำนวนผู้ตอบแยกตามระดับ key เรียงจากมากไปน้อย (เหมือน value_counts)"""
+    counts = cells[ROWS_COL].groupby(level=key, dropna=True, observed=True).sum()
+    return counts[counts > 0].sort_values(ascending=False, kind='stable')
+
+
+# ==============================================================================
+# TREND AGGREGATES (หน่วยงาน × ช่วงเวลารายเดือน/รายสัปดาห์)
+# ==============================================================================
+# สร้างจาก date_col ครั้งเดียวต่อการโหลด เก็บเฉพาะคะแนนความพึงพอใจและ flag ความตั้งใจ
+# ผลรวมรวมกันได้ (associative) แถวใหม่ที่ต่อท้ายจึงสร้าง trend ของแถวใหม่แล้ว merge_trend เข้าไป
+TREND_FREQS = {'M': 'MS', 'W': 'W-MON'}  # ความถี่ของ Period -> ความถี่ของวันเริ่มช่วง (date_range)
+PERIOD_COL = 'ช่วงเวลา'
+
+
+def build_trend(df: pd.DataFrame, freq: str = 'M') -> pd.DataFrame:
+    """ผลรวมต่อ (หน่วยงาน, วันเริ่มช่วง) ของ freq ('M' = เดือน, 'W' = สัปดาห์เริ่มวันจันทร์)"""
+    if 'date_col' not in df.columns or 'หน่วยงาน' not in df.columns:
+        return pd.DataFrame()
+    frame = pd.DataFrame(_cell_parts(df, [SATISFACTION_SCORE_COL], histograms=False, categories=False),
+                         index=df.index)
+    period = df['date_col'].dt.to_period(freq).dt.start_time.rename(PERIOD_COL)
+    return frame.groupby([df['หน่วยงาน'], period], dropna=False, observed=True, sort=True).sum()
+
+
+def merge_trend(trend: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """รวม trend ของแถวใหม่เข้ากับ trend เดิม (ช่วงที่มีทั้งสองชุดรวมผลรวมกัน)"""
+    if trend.empty or new.empty:
+        return new if trend.empty else trend
+    return pd.concat([trend, new]).groupby(level=[0, 1], dropna=False, observed=True, sort=True).sum()
+
+
+def trend_series(trend: pd.DataFrame, freq: str = 'M', department: Optional[str] = None,
+                 window: int = 1) -> pd.DataFrame:
+    """ค่าต่อช่วงเวลา (ครบทุกช่วงตั้งแต่ช่วงแรกถึงช่วงสุดท้าย ช่วงที่ไม่มีข้อมูลเป็น NaN)
+
+    คอลัมน์: จำนวน, ค่าเฉลี่ยคะแนนความพึงพอใจ และ % คำตอบบวกของแต่ละคำถามใน INTENTION_COLS
+    window > 1: ค่าเฉลี่ยเคลื่อนที่จากผลรวมของ window ช่วงล่าสุด (ถ่วงตามจำนวนคำตอบ)
+    """
+    if trend.empty:
+        return pd.DataFrame()
+    if department is not None:
+        trend = trend[(trend.index.get_level_values(0) == department)]
+    sums = trend.groupby(level=PERIOD_COL, sort=True).sum()
+    if sums.empty:
+        return pd.DataFrame()
+    sums = sums.reindex(pd.date_range(sums.index[0], sums.index[-1], freq=TREND_FREQS[freq]), fill_value=0)
+    if window > 1:
+        sums = sums.rolling(window, min_periods=1).sum()
+
+    def ratio(col: str, scale: float = 1.0) -> pd.Series:
+        n = sums.get(count_column_name(col))
+        if n is None:
+            return pd.Series(np.nan, index=sums.index)
+        return sums[sum_column_name(col)].div(n.where(n > 0)) * scale
+
+    out = {'จำนวน': sums[ROWS_COL], SATISFACTION_SCORE_COL: ratio(SATISFACTION_SCORE_COL)}
+    for col in INTENTION_COLS:
+        out[col] = ratio(flag_column_name(col), 100.0)
+    return pd.DataFrame(out).rename_axis(PERIOD_COL)
@@ -0,0 +1,106 @@
+# ==============================================================================
+# BENCHMARK: gauge ทีละ figure (13 × st.plotly_chart) vs รวมเป็น figure เดียวต่อส่วน (2 ×)
+# ==============================================================================
+# วิธีใช้: python benchmarks/bench_gauges.py [--html โฟลเดอร์]
+# วัดฝั่งเซิร์ฟเวอร์ด้วย marshall ของ Streamlit เอง (ขนาด protobuf ที่ส่งให้เบราว์เซอร์ต่อ rerun
+# และเวลาสร้าง figure + serialize) --html เขียนหน้าเว็บสองหน้าที่วาดกราฟชุดเดียวกันด้วย plotly.js
+# แล้วแสดงเวลาวาด (time-to-render) บนหน้า/ชื่อแท็บ เปิดบนเครื่องใน ward เพื่อวัดของจริง
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+from streamlit.elements.plotly_chart import marshall
+from streamlit.proto.PlotlyChart_pb2 import PlotlyChart
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from charts import gauge_figure, gauge_grid_figure, intention_gauges, score_gauges  # noqa: E402
+from compute import FilterSpec, compute_dashboard  # noqa: E402
+from aggregates import build_cube  # noqa: E402
+from ingest import prepare_frame  # noqa: E402
+
+
+def dashboard_gauges():
+    frame = prepare_frame(pd.read_excel(ROOT / 'mpxi.xlsx'))
+    result = compute_dashboard(frame, build_cube(frame), FilterSpec())
+    return score_gauges(result.question_scores), intention_gauges(result.intentions)
+
+
+def single_figures(scores, intentions):
+    return [gauge_figure(g) for g in scores + intentions]
+
+
+def batched_figures(scores, intentions):
+    return [gauge_grid_figure(scores, columns=2), gauge_grid_figure(intentions, columns=3)]
+
+
+def header_bytes(scores, intentions) -> int:
+    # แบบทีละ figure มี st.markdown หัวข้อ + n แยกอีกหนึ่ง element ต่อ gauge
+    return sum(len(f"<div class='gauge-head'>{g.title}</div><div class='gauge-sub'>n = {g.n}</div>".encode())
+               for g in scores + intentions)
+
+
+def payload(figures) -> list:
+    protos = []
+    for fig in figures:
+        proto = PlotlyChart()
+        marshall(proto, fig, True, 'streamlit', 'streamlit')
+        protos.append(proto)
+    return protos
+
+
+def best_of(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def write_render_page(path: str, protos, label: str) -> None:
+    specs = [json.loads(p.figure.spec) for p in protos]
+    divs = ''.join(f'<div id="g{i}"></div>' for i in range(len(specs)))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"""<!doctype html><meta charset="utf-8"><title>{label}</title>
+<script src="https://cdn.plot.ly/plotly-2.27.0.min.js"></script>
+<p id="result">กำลังวาด…</p>{divs}
+<script>
+const specs = {json.dumps(specs, ensure_ascii=False)};
+const t0 = performance.now();
+Promise.all(specs.map((s, i) => Plotly.newPlot('g' + i, s.data, s.layout, {{responsive: true}}))).then(() => {{
+  requestAnimationFrame(() => {{
+    const ms = (performance.now() - t0).toFixed(1);
+    document.getElementById('result').textContent = '{label}: ' + specs.length + ' figure, ' + ms + ' ms';
+    document.title = ms + ' ms';
+  }});
+}});
+</script>""")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--html', help='เขียนหน้าเว็บวัดเวลาวาดไว้ในโฟลเดอร์นี้')
+    args = parser.parse_args(argv)
+
+    scores, intentions = dashboard_gauges()
+    modes = {
+        'single': (lambda: payload(single_figures(scores, intentions)), header_bytes(scores, intentions)),
+        'batched': (lambda: payload(batched_figures(scores, intentions)), 0),
+    }
+    print(f"{'mode':<10} {'charts':>7} {'payload KB':>11} {'build+serialize ms':>19}")
+    for name, (build, extra) in modes.items():
+        protos = build()
+        size = sum(p.ByteSize() for p in protos) + extra
+        print(f"{name:<10} {len(protos):>7} {size / 1024:>11.1f} {best_of(build) * 1e3:>19.1f}")
+        if args.html:
+            os.makedirs(args.html, exist_ok=True)
+            write_render_page(os.path.join(args.html, f'gauges_{name}.html'), protos, name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+# ==============================================================================
+# BENCHMARK: หน่วยความจำของข้อมูลที่เตรียมแล้ว ก่อน/หลัง compact_frame
+# ==============================================================================
+# วิธีใช้: python benchmarks/bench_memory.py [จำนวนแถว]
+# สร้างข้อมูลสังเคราะห์ด้วย synthetic.generate_responses แล้ววัด
+# - ขนาดของ df_original แบบ object (เดิม) และแบบ category/Arrow/int ขนาดเล็ก (ใหม่)
+# - ขนาดของมุมมองที่กรองต่อ rerun: สำเนาจาก boolean mask (เดิม) vs ตำแหน่งแถว (ใหม่)
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT.parent))
+sys.path.insert(0, str(ROOT))
+from aggregates import filter_rows  # noqa: E402
+from ingest import prepare_frame  # noqa: E402
+from synthetic import generate_responses  # noqa: E402
+
+
+def mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+def main(n_rows: int):
+    raw = generate_responses(n_rows)
+    before = prepare_frame(raw, compact=False)
+    after = prepare_frame(raw)
+    # ค่าทุกเซลล์ต้องเท่าเดิม (ตรวจจากแถวสุ่ม)
+    sample = np.random.default_rng(1).integers(0, len(before), 5_000)
+    for col in before.columns:
+        a, b = before[col].iloc[sample].astype(object), after[col].iloc[sample].astype(object)
+        assert a.isna().equals(b.isna()) and a[a.notna()].equals(b[b.notna()]), col
+
+    ward = before['หน่วยงาน'].iloc[0]
+    view_old = before[(before['ปี'] == 2024) & (before['หน่วยงาน'] == ward)]
+    rows_new = filter_rows(after, department=ward, year=2024)
+
+    print(f"rows: {n_rows:,}")
+    print(f"{'':<28}{'object (MB)':>14}{'compact (MB)':>14}")
+    print(f"{'df_original':<28}{mb(before):>14.1f}{mb(after):>14.1f}")
+    print(f"{'filtered view / rerun':<28}{mb(view_old):>14.2f}{rows_new.nbytes / 1e6:>14.2f}")
+    print("\nlargest columns after compact_frame (MB):")
+    usage = after.memory_usage(deep=True, index=False).sort_values(ascending=False).head(8)
+    for col, size in usage.items():
+        print(f"  {size / 1e6:>8.2f}  {str(after[col].dtype):<16} {col[:50]}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000)
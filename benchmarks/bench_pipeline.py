@@ -0,0 +1,107 @@
+# ==============================================================================
+# END-TO-END BENCHMARK: load → prepare → score → aggregate → filter (แยกเวลาตามขั้นตอน)
+# ==============================================================================
+# วิธีใช้: python benchmarks/bench_pipeline.py [จำนวนแถว ...] [--json ผลลัพธ์.json]
+# ข้อมูลมาจาก synthetic.generate_responses (หัวคอลัมน์ดิบแบบ Google Sheets) เขียนเป็น CSV ชั่วคราว
+# แล้ววัดแต่ละขั้นตอนแบบ headless (ไม่ต้องเปิด Streamlit) ขั้นตอน filter วัดแยกทุกชุดตัวกรอง
+# ของ Dashboard (ภาพรวม/หนึ่งหน่วยงาน × ทั้งหมด/ปี/ไตรมาส/เดือน) ทั้งตอนคำนวณใหม่และตอนเจอใน ResultCache
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT.parent))
+sys.path.insert(0, str(ROOT))
+from aggregates import TREND_FREQS, build_cube, build_trend, level_values, slice_cube  # noqa: E402
+from compute import FilterSpec, ResultCache, compare_departments, compute_dashboard  # noqa: E402
+from ingest import prepare_frame  # noqa: E402
+from profiling import StageTimer  # noqa: E402
+from synthetic import generate_responses  # noqa: E402
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+
+def filter_specs(cube: pd.DataFrame):
+    """ชุดตัวกรองเดียวกับ sidebar ของ Dashboard (ใช้หน่วยงานแรกและช่วงเวลาล่าสุด)"""
+    ward = sorted(level_values(cube, 'หน่วยงาน'))[0]
+    year = max(level_values(cube, 'ปี'))
+    year_cells = slice_cube(cube, year=year)
+    quarter = max(level_values(year_cells, 'ไตรมาส'))
+    month = max(level_values(year_cells, 'เดือน'))
+    for dept_label, dept in (('ภาพรวม', None), ('หน่วยงาน', ward)):
+        for period_label, period in (('ทั้งหมด', {}), ('ปี', {'year': year}),
+                                     ('ไตรมาส', {'year': year, 'quarter': quarter}),
+                                     ('เดือน', {'year': year, 'month': month})):
+            yield f'{dept_label}/{period_label}', FilterSpec(department=dept, **period)
+
+
+def run(n_rows: int, tmp: str, repeat: int = 3) -> dict:
+    path = os.path.join(tmp, f'survey_{n_rows}.csv')
+    generate_responses(n_rows).to_csv(path, index=False)
+
+    times = {}
+    df, times['load'] = timed(pd.read_csv, path)
+    # ขั้นตอนเตรียมข้อมูลวัดจาก prepare_frame ตัวจริง (ขั้นตอนใหม่ใน ingest จะขึ้นในตารางเอง)
+    timer = StageTimer('prepare')
+    df = prepare_frame(df, timer=timer)
+    times.update(timer.stages)
+    cube, times['aggregate'] = timed(build_cube, df)
+    _, times['trend'] = timed(lambda d: {f: build_trend(d, f) for f in TREND_FREQS}, df)
+
+    views, cached = {}, {}
+    results = ResultCache()
+    for label, spec in filter_specs(cube):
+        best = float('inf')
+        for _ in range(repeat):
+            _, t = timed(compute_dashboard, df, cube, spec)
+            best = min(best, t)
+        views[label] = best
+        results.get(spec, lambda: compute_dashboard(df, cube, spec))
+        _, cached[label] = timed(results.get, spec, None)
+        if spec.department is None:  # ตารางเปรียบเทียบทุกหน่วยงาน (ส่วนที่ 5) พร้อมช่วงความเชื่อมั่น
+            label = 'เทียบหน่วยงาน/' + label.split('/')[1]
+            views[label] = min(timed(compare_departments, cube, spec, True)[1] for _ in range(repeat))
+            results.get((spec, True), lambda: compare_departments(cube, spec, True))
+            _, cached[label] = timed(results.get, (spec, True), None)
+    return {'rows': n_rows, 'stages': times, 'views': views, 'cached': cached, 'cube_cells': len(cube)}
+
+
+def report(results):
+    stages = list(results[0]['stages'])
+    print(f"{'rows':>10} " + ' '.join(f'{s:>10}' for s in stages) + f" {'total':>10}   (วินาที)")
+    for r in results:
+        st = r['stages']
+        print(f"{r['rows']:>10,} " + ' '.join(f'{st[s]:>10.3f}' for s in stages) + f" {sum(st.values()):>10.3f}")
+    labels = list(results[0]['views'])
+    print(f"\n{'compute (ms)':<22}" + ''.join(f"{r['rows']:>12,}" for r in results)
+          + ''.join(f"{'cached ' + format(r['rows'], ','):>16}" for r in results))
+    for label in labels:
+        print(f'{label:<22}' + ''.join(f"{r['views'][label] * 1e3:>12.2f}" for r in results)
+              + ''.join(f"{r['cached'][label] * 1e3:>16.4f}" for r in results))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('sizes', nargs='*', type=int, default=[1_000, 10_000, 100_000])
+    parser.add_argument('--json', help='บันทึกผลเป็น JSON (ใช้เทียบ regression ระหว่าง commit)')
+    args = parser.parse_args(argv)
+    with tempfile.TemporaryDirectory() as tmp:
+        results = [run(n, tmp) for n in args.sizes]
+    report(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+# ==============================================================================
+# MICRO-BENCHMARK: score_likert_columns vs .apply(normalize_to_1_5)
+# ==============================================================================
+# วิธีใช้: python benchmarks/bench_scoring.py [จำนวนแถว ...]
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from scoring import LIKERT_COLUMNS, normalize_to_1_5, score_likert_columns  # noqa: E402
+
+# คำตอบที่พบจริงในไฟล์ export (ข้อความ, ตัวเลขจากคอลัมน์ "แบบประเมิน [...]" และค่าว่าง)
+ANSWERS = np.array(['มากที่สุด', 'มาก', 'ปานกลาง', 'น้อย', 'น้อยมาก', 'สะดวกมาก', 'สะดวก',
+                    'ชัดเจนมาก', 'ชัดเจนดี', 'เหมาะสมมาก', 'ไม่ชัดเจนเลย', 5, 4, 3, 2, 1, None],
+                   dtype=object)
+
+
+def make_frame(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({c: ANSWERS[rng.integers(0, len(ANSWERS), n_rows)] for c in LIKERT_COLUMNS})
+
+
+def score_with_apply(df: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame({f'{c}__score': df[c].apply(normalize_to_1_5).astype('Float64') for c in LIKERT_COLUMNS})
+
+
+def best_of(fn, *args, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(sizes):
+    print(f"{'rows':>10} {'apply (s)':>12} {'engine (s)':>12} {'speedup':>9}")
+    for n in sizes:
+        df = make_frame(n)  # ผลลัพธ์ตรงกับ .apply(normalize_to_1_5) ทดสอบใน tests/test_scoring.py
+        t_apply = best_of(score_with_apply, df)
+        t_engine = best_of(score_likert_columns, df)
+        print(f"{n:>10,} {t_apply:>12.4f} {t_engine:>12.4f} {t_apply / t_engine:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [1_000, 10_000, 100_000])
@@ -0,0 +1,56 @@
+# ==============================================================================
+# BENCHMARK: cold start จาก mpxi.xlsx vs snapshot ไบนารี (Feather, memory-map)
+# ==============================================================================
+# วิธีใช้: python benchmarks/bench_snapshot.py [จำนวนเท่าของ mpxi.xlsx ...]
+# xlsx = pd.read_excel + prepare_frame (เส้นทางเดิมตอน cold start/ไฟล์สำรอง)
+# snapshot = load_snapshot (ข้อมูลที่เตรียมแล้ว ไม่ต้อง rename/แปลงวันที่/คิดคะแนนใหม่)
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from ingest import prepare_frame  # noqa: E402
+from snapshots import available, load_snapshot, save_snapshot  # noqa: E402
+
+SEED_FILE = ROOT / 'mpxi.xlsx'
+
+
+def best_of(fn, *args, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def cold_start_xlsx(path: str) -> pd.DataFrame:
+    return prepare_frame(pd.read_excel(path))
+
+
+def main(factors):
+    if not available():
+        sys.exit("ต้องติดตั้ง pyarrow เพื่อใช้ snapshot")
+    seed = pd.read_excel(SEED_FILE)
+    print(f"{'rows':>10} {'xlsx (s)':>10} {'snapshot (s)':>13} {'speedup':>9} {'xlsx MB':>9} {'snap MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for k in factors:
+            xlsx_path = os.path.join(tmp, f'seed_{k}.xlsx')
+            snap_path = os.path.join(tmp, f'snap_{k}.feather')
+            pd.concat([seed] * k, ignore_index=True).to_excel(xlsx_path, index=False)
+            frame = cold_start_xlsx(xlsx_path)
+            save_snapshot(frame, {'source': xlsx_path}, snap_path)
+
+            t_xlsx = best_of(cold_start_xlsx, xlsx_path, repeat=1 if k > 10 else 3)
+            t_snap = best_of(load_snapshot, snap_path)
+            print(f"{len(frame):>10,} {t_xlsx:>10.3f} {t_snap:>13.4f} {t_xlsx / t_snap:>8.1f}x "
+                  f"{os.path.getsize(xlsx_path) / 1e6:>9.1f} {os.path.getsize(snap_path) / 1e6:>9.1f}")
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [1, 10, 50])
@@ -0,0 +1,133 @@
+# ==============================================================================
+# SYNTHETIC SURVEY GENERATOR
+# ==============================================================================
+# สร้างคำตอบแบบประเมินสังเคราะห์ในรูปแบบเดียวกับไฟล์ export ของ Google Sheets
+# (หัวคอลัมน์ภาษาไทยตาม COLUMN_MAPPING, ประทับเวลา, คำตอบ Likert, หอผู้ป่วย, ความคิดเห็น)
+# วิธีใช้: python benchmarks/synthetic.py จำนวนแถว ไฟล์ปลายทาง.csv [--wards 30] [--years 3] [--seed 0]
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from ingest import COLUMN_MAPPING, TIMESTAMP_COL  # noqa: E402
+
+RAW_HEADER = {v: k for k, v in COLUMN_MAPPING.items()}  # ชื่อใหม่ -> หัวคอลัมน์ดิบ
+
+WARDS = ['หอผู้ป่วยพิเศษ 10B', 'หอผู้ป่วยศัลยศาสตร์ 12A', 'หอผู้ป่วยศัลยศาสตร์ 9A', 'หอผู้ป่วยออร์โธปิดิกส์ 10A',
+         'หอผู้ป่วยศัลยศาสตร์ 8B', 'หอผู้ป่วยสามัญชาย 7B', 'หอผู้ป่วยสามัญหญิง 7A', 'หอผู้ป่วยเด็ก 9B']
+
+CHOICES = {
+    'เพศ': (['หญิง', 'ชาย', 'ไม่ต้องการระบุ'], [0.55, 0.43, 0.02]),
+    'อายุ': (['ต่ำกว่า 18 ปี', 'อายุ 18 - 35 ปี', 'อายุ 36 - 51 ปี', 'อายุ 52 - 70 ปี', 'มากกว่า 70 ปี'],
+             [0.08, 0.22, 0.27, 0.30, 0.13]),
+    'ภูมิลำเนา': (['ภายในจังหวัดเชียงราย', 'นอกจังหวัดเชียงราย', 'ต่างประเทศ'], [0.85, 0.13, 0.02]),
+    'อาชีพ': (['เกษตรกร', 'รับจ้าง', 'ค้าขาย', 'ข้าราชการ', 'นักเรียน/นักศึกษา', 'แม่บ้าน', 'ข้าราชการเกษียณ'],
+              [0.25, 0.25, 0.15, 0.1, 0.1, 0.1, 0.05]),
+    'สิทธิการรักษา': (['บัตรทอง', 'ประกันสังคม', 'จ่ายตรง', 'กรมบัญชีกลาง', 'ชำระเงินเอง'],
+                      [0.5, 0.2, 0.15, 0.1, 0.05]),
+    'สุขภาพโดยรวม': (['สุขภาพดี', 'ปานกลาง', 'สุขภาพไม่ดี'], [0.55, 0.35, 0.10]),
+    'กลับมารับบริการหรือไม่': (['ใช่', 'ไม่ใช่'], [0.97, 0.03]),
+    'แนะนำผู้อื่นหรือไม่': (['ใช่', 'ไม่ใช่'], [0.96, 0.04]),
+}
+LIKERT_WORDS = ['มากที่สุด', 'มาก', 'ปานกลาง', 'น้อย', 'น้อยมาก']
+LIKERT_P = np.array([0.55, 0.32, 0.09, 0.03, 0.01])
+QUESTION_COLS = ['Q1_ความสะดวกการรับบริการ', 'Q2_การรับฟัง', 'Q3_ความชัดเจนข้อมูลบริการ', 'Q4_ความเท่าเทียม',
+                 'Q5_ความสะอาดและสิ่งอำนวยความสะดวก', 'Q6_การตอบสนอง', 'Q7_ข้อมูลค่าใช้จ่าย',
+                 'Q8_ข้อมูลการรักษา', 'Q9_การมีส่วนร่วมวางแผน', 'Q10_ข้อมูลด้านยา']
+
+COMPLAINTS = ['เสียงดังตอนกลางคืน นอนไม่หลับ', 'กดปุ่มเรียกพยาบาลแล้วรอนาน', 'รอรับยากลับบ้านนานมาก',
+              'ห้องน้ำไม่ค่อยสะอาด', 'ไม่ได้รับคำอธิบายเรื่องยาที่ได้รับ', 'ค่าใช้จ่ายไม่ชัดเจน',
+              'เจ้าหน้าที่พูดจาไม่สุภาพ', 'ห้องพักไม่มี wifi', 'แอร์ไม่เย็น', 'อาหารไม่อร่อย',
+              'รอสรุปค่ารักษาหลังแพทย์ให้กลับบ้านหลายชั่วโมง', 'ที่จอดรถไม่เพียงพอ']
+SUGGESTIONS = ['อยากให้ดีแบบนี้ตลอดและประทับใจมากค่ะ', 'การให้บริการที่ดี และดียิ่งขึ้นไป',
+               'อยากให้เพิ่มพยาบาลเวรดึก', 'ควรแจ้งค่าใช้จ่ายล่วงหน้า', 'ขอบคุณคุณหมอและพยาบาลทุกท่าน',
+               'อยากให้มีที่นั่งสำหรับญาติมากขึ้น', 'ควรปรับปรุงเรื่องความสะอาดห้องน้ำ',
+               'อยากให้อธิบายวิธีใช้ยาให้ละเอียดกว่านี้']
+NO_COMMENT = np.array(['', 'ไม่มี', '-', None], dtype=object)
+
+
+def ward_names(n_wards: int) -> list:
+    extra = [f'หอผู้ป่วยรวม {i}' for i in range(1, max(0, n_wards - len(WARDS)) + 1)]
+    return (WARDS + extra)[:n_wards]
+
+
+def _pick(rng, values, p, n):
+    return np.asarray(values, dtype=object)[rng.choice(len(values), size=n, p=p)]
+
+
+def _free_text(rng, pool, n, p_filled):
+    first = rng.integers(0, len(pool), n)
+    second = rng.integers(0, len(pool), n)
+    pool = np.asarray(pool, dtype=object)
+    text = np.where(rng.random(n) < 0.3, pool[first] + ' และ' + pool[second], pool[first])
+    empty = NO_COMMENT[rng.integers(0, len(NO_COMMENT), n)]
+    return np.where(rng.random(n) < p_filled, text, empty)
+
+
+def generate_responses(n_rows: int, n_wards: int = 30, years: int = 3, seed: int = 0,
+                       end: str = '2025-09-30') -> pd.DataFrame:
+    """คำตอบสังเคราะห์ n_rows แถว (หัวคอลัมน์ดิบ เรียงตามประทับเวลาเหมือนชีตของฟอร์ม)"""
+    rng = np.random.default_rng(seed)
+    n = n_rows
+    stop = pd.Timestamp(end).value // 10**9
+    stamps = pd.to_datetime(np.sort(rng.integers(stop - years * 365 * 86400, stop, n)), unit='s')
+    cols = {TIMESTAMP_COL: stamps.strftime('%d/%m/%Y %H:%M:%S')}
+
+    # หอผู้ป่วยแต่ละแห่งมีการกระจายคะแนนของตัวเอง (ค่าเฉลี่ยต่างกันเล็กน้อย)
+    wards = ward_names(n_wards)
+    ward_idx = rng.integers(0, len(wards), n)
+    cols['หน่วยงาน'] = np.asarray(wards, dtype=object)[ward_idx]
+    ward_p = rng.dirichlet(LIKERT_P * 60, size=len(wards))
+    cum = ward_p.cumsum(axis=1)
+
+    def likert_codes():
+        # 0 = มากที่สุด ... 4 = น้อยมาก ตามการกระจายของหอผู้ป่วยของแถวนั้น
+        return np.minimum((rng.random(n)[:, None] > cum[ward_idx]).sum(axis=1), 4)
+
+    for name, (values, p) in CHOICES.items():
+        cols[name] = _pick(rng, values, p, n)
+    visit = stamps - pd.to_timedelta(rng.integers(0, 10, n), unit='D')
+    cols['วันที่รับบริการ'] = visit.strftime('%d/%m/%Y')
+    nights = rng.integers(1, 15, n).astype(object)
+    as_text = rng.random(n) < 0.1
+    cols['วันนอน'] = np.where(as_text, [f'{d} วัน' for d in nights], nights)
+
+    cols['ความพึงพอใจโดยรวม'] = np.asarray(LIKERT_WORDS, dtype=object)[likert_codes()]
+    for q in QUESTION_COLS:
+        scores = (5 - likert_codes()).astype(float)
+        scores[rng.random(n) < 0.02] = np.nan
+        cols[q] = scores
+
+    dissatisfied = rng.random(n) < 0.06
+    cols['มีความไม่พึงพอใจหรือไม่'] = np.where(dissatisfied, 'มี', 'ไม่มี')
+    complaints = _free_text(rng, COMPLAINTS, n, 0.9)
+    cols['รายละเอียดความไม่พึงพอใจ'] = np.where(dissatisfied, complaints, NO_COMMENT[rng.integers(0, 4, n)])
+    cols['ความคาดหวังต่อบริการ'] = _free_text(rng, SUGGESTIONS, n, 0.3)
+
+    df = pd.DataFrame(cols)
+    df['ผู้ตอบแบบสอบถาม'] = _pick(rng, ['ผู้ป่วย', 'ญาติผู้ป่วย'], [0.6, 0.4], n)
+    return df.rename(columns=RAW_HEADER)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='สร้างคำตอบแบบประเมินสังเคราะห์ (CSV) ในรูปแบบเดียวกับไฟล์ export ของ Google Sheets')
+    parser.add_argument('rows', type=int)
+    parser.add_argument('output')
+    parser.add_argument('--wards', type=int, default=30)
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    df = generate_responses(args.rows, n_wards=args.wards, years=args.years, seed=args.seed)
+    if args.output.lower().endswith('.xlsx'):
+        df.to_excel(args.output, index=False)
+    else:
+        df.to_csv(args.output, index=False)
+    print(f"wrote {len(df):,} rows to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+# ==============================================================================
+# GAUGE FIGURES
+# ==============================================================================
+# สร้าง Plotly figure ของ gauge โดยไม่เรียก Streamlit มีสองแบบ
+# - gauge_figure: หนึ่ง gauge ต่อหนึ่ง figure (แบบเดิม: st.plotly_chart ทีละอัน)
+# - gauge_grid_figure: ทุก gauge ของส่วนหนึ่งใน figure เดียว (Indicator หลาย trace แบ่ง domain กัน)
+#   เบราว์เซอร์ได้ JSON ก้อนเดียวและ mount กราฟครั้งเดียวต่อส่วน แทน 10 + 3 ครั้ง
+import math
+from dataclasses import dataclass
+from typing import List, Sequence
+
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from scoring import SATISFACTION_COLS
+
+BAR_COLOR = '#111827'
+SCORE_STEPS = [{'range': [1, 2], 'color': '#DC2626'}, {'range': [2, 3], 'color': '#EA580C'},
+               {'range': [3, 4], 'color': '#F59E0B'}, {'range': [4, 5], 'color': '#16A34A'}]
+MARGIN = dict(t=10, b=10, l=10, r=10)
+
+
+@dataclass(frozen=True)
+class Gauge:
+    title: str
+    value: float
+    n: int
+    kind: str = 'score'       # 'score' = คะแนน 1-5, 'percent' = 0-100%
+    mode: str = 'high_good'   # เฉพาะ percent: 'low_good' = ยิ่งต่ำยิ่งดี (เช่น % ไม่พึงพอใจ)
+
+
+def percent_steps(mode: str = 'high_good') -> List[dict]:
+    colors = ['#DC2626', '#EA580C', '#F59E0B', '#16A34A'] if mode == 'high_good' else ['#16A34A', '#F59E0B', '#EA580C', '#DC2626']
+    ranges = [[0, 50], [50, 65], [65, 80], [80, 100]] if mode == 'high_good' else [[0, 5], [5, 10], [10, 20], [20, 100]]
+    return [{'range': r, 'color': c} for r, c in zip(ranges, colors)]
+
+
+def _indicator(g: Gauge, **kwargs) -> go.Indicator:
+    value = float(g.value)
+    if g.kind == 'percent':
+        axis, steps, number = [0, 100], percent_steps(g.mode), {'suffix': '%', 'valueformat': '.1f'}
+    else:
+        axis, steps, number = [1, 5], SCORE_STEPS, {'valueformat': '.2f'}
+    return go.Indicator(mode="gauge+number", value=value, number=number,
+                        gauge={'axis': {'range': axis}, 'bar': {'color': BAR_COLOR}, 'steps': steps,
+                               'threshold': {'line': {'color': BAR_COLOR, 'width': 2}, 'thickness': 0.6,
+                                             'value': value}},
+                        **kwargs)
+
+
+def gauge_figure(g: Gauge, height: int = 200) -> go.Figure:
+    fig = go.Figure(_indicator(g))
+    fig.update_layout(margin=MARGIN, height=height)
+    return fig
+
+
+def gauge_grid_figure(gauges: Sequence[Gauge], columns: int = 2, gauge_height: int = 200,
+                      title_height: int = 56) -> go.Figure:
+    """ทุก gauge ใน figure เดียว เรียงเป็นตาราง columns คอลัมน์ (หัวข้อ + n อยู่เหนือแต่ละ gauge)
+
+    gauge ที่ n = 0 แสดงเฉพาะหัวข้อและข้อความ "ไม่มีข้อมูล"
+    """
+    rows = max(1, math.ceil(len(gauges) / columns))
+    cell = gauge_height + title_height
+    plot_height = rows * cell
+    fig = go.Figure()
+    annotations = []
+    for i, g in enumerate(gauges):
+        r, c = divmod(i, columns)
+        x0, x1 = c / columns, (c + 1) / columns
+        top = 1 - r * cell / plot_height
+        gauge_top = top - title_height / plot_height
+        bottom = top - cell / plot_height
+        annotations.append(dict(
+            x=x0, y=top, xref='paper', yref='paper', xanchor='left', yanchor='top', align='left',
+            showarrow=False, font=dict(size=18, color='#111'),
+            text=f"<b>{g.title}</b><br><span style='font-size:16px;color:#374151'>n = {g.n}</span>"))
+        if g.n:
+            fig.add_trace(_indicator(g, domain={'x': [x0 + 0.02, x1 - 0.02],
+                                                'y': [bottom + 10 / plot_height, gauge_top - 10 / plot_height]}))
+        else:
+            annotations.append(dict(x=(x0 + x1) / 2, y=(bottom + gauge_top) / 2, xref='paper', yref='paper',
+                                    showarrow=False, text="ไม่มีข้อมูล", font=dict(size=16, color='#6b7280')))
+    fig.update_layout(margin=MARGIN, height=plot_height + MARGIN['t'] + MARGIN['b'], annotations=annotations)
+    return fig
+
+
+# gauge ของส่วนที่ 2 (คะแนนรายหัวข้อ) และส่วนที่ 3 (ความตั้งใจ) จาก DashboardResult
+# ใช้ร่วมกันระหว่างหน้า Dashboard และรายงานแบบ static (report.py)
+INTENTION_GAUGES = [("1. กลับมารับบริการ (ใช่)", 'กลับมารับบริการหรือไม่', 'high_good'),
+                    ("2. แนะนำผู้อื่น (ใช่)", 'แนะนำผู้อื่นหรือไม่', 'high_good'),
+                    ("3. ไม่พึงพอใจ (มี)", 'มีความไม่พึงพอใจหรือไม่', 'low_good')]
+RATING_COLORS = ['#DC2626', '#EA580C', '#F59E0B', '#22C55E', '#16A34A']
+
+
+def score_gauges(question_scores) -> List[Gauge]:
+    return [Gauge(title, *question_scores[col]) for col, title in SATISFACTION_COLS.items()]
+
+
+def intention_gauges(intentions) -> List[Gauge]:
+    return [Gauge(title, *intentions[col], kind='percent', mode=mode) for title, col, mode in INTENTION_GAUGES]
+
+
+def rating_figure(score_counts: pd.Series, title: str, height: int = 280) -> go.Figure:
+    """จำนวนคำตอบแต่ละคะแนน (1-5)"""
+    rc = score_counts.rename_axis('คะแนน').reset_index(name='จำนวน')
+    fig = go.Figure(go.Bar(x=rc['คะแนน'], y=rc['จำนวน'], text=rc['จำนวน'], textposition='auto',
+                           marker_color=RATING_COLORS))
+    fig.update_layout(title=title, height=height, margin=dict(t=40, b=40, l=40, r=40))
+    return fig
+
+
+# ==============================================================================
+# TREND FIGURE
+# ==============================================================================
+# series จาก aggregates.trend_series: แถวบน = คะแนนความพึงพอใจเฉลี่ย (1-5) แถวล่าง = % ความตั้งใจ
+TREND_LINES = [('กลับมารับบริการหรือไม่', '% กลับมาใช้บริการ', '#16A34A'),
+               ('แนะนำผู้อื่นหรือไม่', '% การบอกต่อ', '#2563EB'),
+               ('มีความไม่พึงพอใจหรือไม่', '% ไม่พึงพอใจ', '#DC2626')]
+
+
+def trend_figure(series: pd.DataFrame, score_col: str, height: int = 520) -> go.Figure:
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.08, row_heights=[0.45, 0.55],
+                        subplot_titles=("คะแนนความพึงพอใจเฉลี่ย (1–5)", "ความตั้งใจในอนาคต (%)"))
+    n = series['จำนวน']
+    fig.add_trace(go.Scatter(x=series.index, y=series[score_col], mode='lines+markers', name='คะแนนเฉลี่ย',
+                             line=dict(color=BAR_COLOR), customdata=n,
+                             hovertemplate='%{y:.2f} (n = %{customdata:,})<extra></extra>'), row=1, col=1)
+    for col, label, color in TREND_LINES:
+        if col in series.columns:
+            fig.add_trace(go.Scatter(x=series.index, y=series[col], mode='lines+markers', name=label,
+                                     line=dict(color=color), customdata=n,
+                                     hovertemplate='%{y:.1f}% (n = %{customdata:,})<extra></extra>'), row=2, col=1)
+    fig.update_yaxes(range=[1, 5], row=1, col=1)
+    fig.update_yaxes(range=[0, 100], row=2, col=1)
+    fig.update_layout(height=height, margin=dict(t=40, b=10, l=10, r=10), hovermode='x unified',
+                      legend=dict(orientation='h', yanchor='bottom', y=-0.15))
+    return fig
+
+
+# ==============================================================================
+# DEPARTMENT COMPARISON
+# ==============================================================================
+# means: แถว = หน่วยงาน, คอลัมน์ = หัวข้อคะแนน (ค่าเฉลี่ย 1-5) สีไล่ตามช่วงค่าจริงของตาราง
+# (ไม่ใช่ 1-5) หน่วยงานที่ต่างกันไม่กี่ทศนิยมจึงยังเห็นความต่าง
+COMPARE_SCALE = ['#DC2626', '#F59E0B', '#FEF3C7', '#86EFAC', '#16A34A']
+
+
+def comparison_heatmap(means: pd.DataFrame, counts: pd.DataFrame, row_height: int = 28) -> go.Figure:
+    fig = go.Figure(go.Heatmap(
+        z=means.to_numpy(), x=list(means.columns), y=list(means.index), customdata=counts.to_numpy(),
+        colorscale=COMPARE_SCALE, texttemplate='%{z:.2f}', xgap=1, ygap=1,
+        hovertemplate='%{y}<br>%{x}: %{z:.2f} (n = %{customdata:,})<extra></extra>'))
+    fig.update_layout(height=len(means) * row_height + 120, margin=dict(t=10, b=10, l=10, r=10),
+                      xaxis=dict(side='top'), yaxis=dict(autorange='reversed'))
+    return fig
@@ -0,0 +1,181 @@
+# ==============================================================================
+# FREE-TEXT COMMENTS (ความไม่พึงพอใจ / ความคาดหวังต่อบริการ)
+# ==============================================================================
+# ตอนโหลดข้อมูล add_comment_flags เพิ่มคอลัมน์ boolean '<คอลัมน์>__has' ว่าแถวนั้นมีความคิดเห็นจริง
+# หรือไม่ (ทำครั้งเดียว rerun ไม่ต้อง strip/isin ข้อความทั้งคอลัมน์อีก) แต่ละ rerun เก็บเพียงตำแหน่งแถว
+# (CommentRows) แล้วดึงข้อความมาแสดงทีละหน้า ข้อมูลที่ส่งให้เบราว์เซอร์จึงมีขนาดคงที่ต่อ rerun
+import math
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from aggregates import take_rows
+
+COMPLAINT_COL = 'รายละเอียดความไม่พึงพอใจ'
+SUGGESTION_COLS = ['ความคาดหวังต่อบริการของโรงพยาบาลในภาพรวม', 'ความคาดหวังต่อบริการ']
+EMPTY_COMMENTS = ['', 'ไม่มี', '-', 'nan']
+
+# คอลัมน์ความคิดเห็น -> ตัดคำตอบที่ไม่ใช่ความคิดเห็น (EMPTY_COMMENTS) ออกด้วยหรือไม่
+# (ข้อเสนอแนะแสดงทุกคำตอบที่ไม่ว่าง เหมือนตารางเดิม)
+COMMENT_COLS: Dict[str, bool] = {COMPLAINT_COL: True, **{c: False for c in SUGGESTION_COLS}}
+PAGE_SIZE = 50
+
+
+def has_comment_column_name(col: str) -> str:
+    return f'{col}__has'
+
+
+def comment_flags(series: pd.Series, drop_placeholders: bool = True) -> pd.Series:
+    """True เมื่อแถวมีความคิดเห็น (ไม่ว่าง และไม่ใช่ 'ไม่มี' / '-' เมื่อ drop_placeholders)"""
+    codes, uniques = pd.factorize(series.to_numpy(dtype=object), use_na_sentinel=True)
+    if drop_placeholders:
+        table = np.array([str(u).strip() not in EMPTY_COMMENTS for u in uniques] + [False], dtype=bool)
+    else:
+        table = np.array([True] * len(uniques) + [False], dtype=bool)
+    return pd.Series(table[codes], index=series.index)
+
+
+def add_comment_flags(df: pd.DataFrame) -> pd.DataFrame:
+    """เพิ่ม '<คอลัมน์>__has' ของคอลัมน์ความคิดเห็นที่มีในข้อมูล (ข้ามคอลัมน์ที่มี flag อยู่แล้ว)"""
+    extra = {has_comment_column_name(col): comment_flags(df[col], drop_placeholders)
+             for col, drop_placeholders in COMMENT_COLS.items()
+             if col in df.columns and has_comment_column_name(col) not in df.columns}
+    return df.assign(**extra) if extra else df
+
+
+def suggestion_column(frame: pd.DataFrame) -> Optional[str]:
+    return next((c for c in SUGGESTION_COLS if c in frame.columns), None)
+
+
+@dataclass(frozen=True)
+class CommentRows:
+    """ตำแหน่งแถว (ใน frame) ที่มีความคิดเห็นในคอลัมน์ column ตามลำดับเดิมของข้อมูล"""
+    column: str
+    rows: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def empty(self) -> bool:
+        return len(self.rows) == 0
+
+    def page_count(self, page_size: int = PAGE_SIZE) -> int:
+        return max(1, math.ceil(len(self.rows) / page_size))
+
+    def page(self, frame: pd.DataFrame, page: int, page_size: int = PAGE_SIZE) -> pd.DataFrame:
+        """หน้าที่ page (เริ่มที่ 1): คอลัมน์ หน่วยงาน + ความคิดเห็น"""
+        start = (page - 1) * page_size
+        return take_rows(frame, self.rows[start:start + page_size], ['หน่วยงาน', self.column])
+
+    def table(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """ทุกแถว (สำหรับรายงาน/ส่งออก)"""
+        return take_rows(frame, self.rows, ['หน่วยงาน', self.column])
+
+
+def comment_rows(frame: pd.DataFrame, rows: np.ndarray, col: str) -> CommentRows:
+    """เฉพาะแถวใน rows (ผลของ filter_rows) ที่มีความคิดเห็นในคอลัมน์ col"""
+    flag = has_comment_column_name(col)
+    if flag in frame.columns:
+        has = frame[flag].to_numpy(dtype=bool)
+    else:  # ข้อมูลที่ไม่ได้ผ่าน add_comment_flags
+        has = comment_flags(frame[col], COMMENT_COLS.get(col, True)).to_numpy()
+    return CommentRows(col, rows[has[rows]])
+
+
+# ==============================================================================
+# SEARCH INDEX (character n-grams)
+# ==============================================================================
+# ภาษาไทยไม่เว้นวรรคระหว่างคำ จึงทำดัชนีจากอักขระเดี่ยวและอักขระติดกันทีละ 2 ตัว (bigram) แทนการตัดคำ
+# ดัชนีอยู่บน "ข้อความไม่ซ้ำ" (ข้อความซ้ำกันหลายแถวตัด n-gram ครั้งเดียว) และ codes บอกว่าแถวไหนคือข้อความใด
+# ค้นหา = intersect posting list ของทุก bigram ในคำค้น → ตรวจว่ามีคำค้นต่อเนื่องจริง (เฉพาะคำค้นยาวกว่า
+# 2 ตัวอักษร) → แปลงเป็นแถวที่อยู่ในตัวกรองปัจจุบัน ข้อความใหม่ได้ id ต่อท้าย ดัชนีจึงต่อเพิ่มได้โดยไม่ทำใหม่
+GRAM = 2
+
+
+def normalize_text(text) -> str:
+    return ' '.join(str(text).casefold().split())
+
+
+def text_grams(text: str) -> set:
+    """bigram ทั้งหมดของข้อความ (ข้อความสั้นกว่า 2 ตัวอักษร: ตัวข้อความเอง)"""
+    if len(text) < GRAM:
+        return {text} if text else set()
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+class _ColumnIndex:
+    def __init__(self, texts: list, codes: np.ndarray, postings: Dict[str, np.ndarray]):
+        self.texts = texts        # id ข้อความ -> ข้อความที่ normalize แล้ว
+        self.codes = codes        # ตำแหน่งแถว -> id ข้อความ (-1 = ไม่มีความคิดเห็น)
+        self.postings = postings  # n-gram -> id ข้อความ (เรียงจากน้อยไปมาก)
+
+    def extended(self, values: np.ndarray, has: np.ndarray) -> '_ColumnIndex':
+        codes, uniques = pd.factorize(np.where(has, values, None), use_na_sentinel=True)
+        offset = len(self.texts)
+        texts = [normalize_text(u) for u in uniques]
+        by_gram: Dict[str, list] = {}
+        for uid, text in enumerate(texts, start=offset):
+            for gram in text_grams(text) | set(text):
+                by_gram.setdefault(gram, []).append(uid)
+        postings = dict(self.postings)
+        for gram, uids in by_gram.items():
+            new = np.array(uids, dtype=np.int32)
+            postings[gram] = np.concatenate([postings[gram], new]) if gram in postings else new
+        codes = np.where(codes >= 0, codes + offset, -1).astype(np.int32)
+        return _ColumnIndex(self.texts + texts, np.concatenate([self.codes, codes]), postings)
+
+    def matching_ids(self, q: str) -> np.ndarray:
+        lists = [self.postings.get(g) for g in text_grams(q)]
+        if any(ids is None for ids in lists):
+            return np.empty(0, dtype=np.int32)
+        lists.sort(key=len)
+        ids = lists[0]
+        for other in lists[1:]:
+            ids = np.intersect1d(ids, other, assume_unique=True)
+        if len(q) > GRAM:  # มีทุก bigram ไม่ได้แปลว่ามีคำค้นต่อเนื่อง
+            ids = ids[np.fromiter((q in self.texts[i] for i in ids), dtype=bool, count=len(ids))]
+        return ids
+
+
+_EMPTY_COLUMN = _ColumnIndex([], np.empty(0, dtype=np.int32), {})
+
+
+class CommentIndex:
+    """ดัชนีค้นหาคอลัมน์ความคิดเห็น (ไม่แก้ไขหลังสร้าง: extended คืนดัชนีใหม่ที่ใช้ posting เดิมร่วมกัน)"""
+
+    def __init__(self, columns: Optional[Dict[str, _ColumnIndex]] = None, size: int = 0):
+        self._columns = columns or {}
+        self.size = size  # จำนวนแถวของ frame ที่ทำดัชนีแล้ว
+
+    @classmethod
+    def build(cls, frame: pd.DataFrame) -> 'CommentIndex':
+        return cls().extended(frame, 0)
+
+    def extended(self, frame: pd.DataFrame, start: int) -> 'CommentIndex':
+        """ดัชนีของ frame โดยทำเพิ่มเฉพาะแถวตั้งแต่ตำแหน่ง start (แถวก่อนหน้าต้องเป็นชุดเดิม)"""
+        columns = dict(self._columns)
+        for col in COMMENT_COLS:
+            if col not in frame.columns:
+                continue
+            flag = has_comment_column_name(col)
+            has = frame[flag].to_numpy(dtype=bool)[start:] if flag in frame.columns else \
+                comment_flags(frame[col].iloc[start:], COMMENT_COLS[col]).to_numpy()
+            values = frame[col].to_numpy(dtype=object)[start:]
+            columns[col] = columns.get(col, _EMPTY_COLUMN).extended(values, has)
+        return CommentIndex(columns, len(frame))
+
+    def search(self, frame: pd.DataFrame, query: str, within: CommentRows) -> CommentRows:
+        """แถวใน within (ตามตัวกรองปัจจุบัน) ที่ความคิดเห็นมีคำค้น query (ไม่สนตัวพิมพ์เล็ก/ใหญ่)"""
+        q = normalize_text(query)
+        if not q:
+            return within
+        index = self._columns.get(within.column)
+        if index is None or len(index.codes) != len(frame):  # ไม่มีดัชนีของ frame นี้: ตรวจทีละแถว
+            texts = frame[within.column].to_numpy(dtype=object)[within.rows]
+            hit = np.fromiter((q in normalize_text(t) for t in texts), dtype=bool, count=len(texts))
+            return CommentRows(within.column, within.rows[hit])
+        ids = index.matching_ids(q)
+        return CommentRows(within.column, within.rows[np.isin(index.codes[within.rows], ids)])
@@ -0,0 +1,121 @@
+# ==============================================================================
+# DASHBOARD COMPUTE LAYER
+# ==============================================================================
+# คำนวณตัวเลขและข้อมูลกราฟทั้งหมดของหน้า Dashboard จากข้อมูลที่เตรียมแล้ว + cube
+# โดยไม่เรียก Streamlit เลย (ทดสอบ/วัดเวลาแบบ headless ได้) ผลลัพธ์ต่อชุดตัวกรองถูกเก็บใน
+# ResultCache แบบ LRU ที่ผูกกับ Snapshot การเปิดดูหน่วยงาน/ช่วงเวลาเดิมซ้ำจึงแทบไม่มีต้นทุน
+# ตารางความคิดเห็นเก็บเป็นตำแหน่งแถว (CommentRows) หน้าเว็บดึงข้อความทีละหน้า
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from aggregates import (HEALTH_COL, ROWS_COL, category_mode, compare_levels, filter_rows, flag_percent,
+                        rows_by_level, score_histogram, score_mean, slice_cube, total)
+from comments import COMPLAINT_COL, CommentRows, comment_rows, suggestion_column
+from scoring import (INTENTION_COLS, LIKERT_COLUMNS, OVERALL_COL, SATISFACTION_SCORE_COL, flag_column_name,
+                     score_column_name)
+
+
+@dataclass(frozen=True)
+class FilterSpec:
+    department: Optional[str] = None  # None = ภาพรวมทั้งหมด
+    year: Optional[int] = None
+    quarter: Optional[int] = None
+    month: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class DashboardResult:
+    spec: FilterSpec
+    total_responses: int
+    avg_satisfaction: float
+    health_mode: Optional[str]
+    overall_histogram: pd.Series                       # จำนวนคะแนน 1-5 ของความพึงพอใจโดยรวม
+    question_scores: Dict[str, Tuple[float, int]]      # คอลัมน์ Likert -> (ค่าเฉลี่ย, n)
+    intentions: Dict[str, Tuple[float, int]]           # คำถามใช่/ไม่ใช่ -> (% บวก, n)
+    responses_by_department: Optional[pd.DataFrame]    # เฉพาะภาพรวมทั้งหมด
+    complaints: Optional[CommentRows]                  # None = ไม่มีคอลัมน์นี้ในข้อมูล
+    suggestions: Optional[CommentRows]
+
+    @property
+    def empty(self) -> bool:
+        return self.total_responses == 0
+
+
+def compute_dashboard(frame: pd.DataFrame, cube: pd.DataFrame, spec: FilterSpec,
+                      rows: Optional[np.ndarray] = None) -> DashboardResult:
+    """ตัวเลขทุกส่วนของหน้า Dashboard สำหรับตัวกรองหนึ่งชุด
+
+    rows: ตำแหน่งแถวที่ตรงกับ spec ที่คำนวณไว้แล้ว (เช่น จาก groupby ครั้งเดียวของ report.py)
+    ถ้าไม่ระบุจะหาด้วย filter_rows
+    """
+    cells = slice_cube(cube, **asdict(spec))
+    tot = total(cells)
+    n_rows = int(tot.get(ROWS_COL, 0))
+    avg, _ = score_mean(tot, SATISFACTION_SCORE_COL)
+
+    if rows is None:
+        rows = filter_rows(frame, **asdict(spec))
+    complaints = comment_rows(frame, rows, COMPLAINT_COL) if COMPLAINT_COL in frame.columns else None
+    suggestion_col = suggestion_column(frame)
+    suggestions = comment_rows(frame, rows, suggestion_col) if suggestion_col else None
+
+    by_department = None
+    if spec.department is None and n_rows:
+        by_department = rows_by_level(cells, 'หน่วยงาน').reset_index(name='จำนวน')
+
+    return DashboardResult(
+        spec=spec,
+        total_responses=n_rows,
+        avg_satisfaction=avg,
+        health_mode=category_mode(tot, HEALTH_COL),
+        overall_histogram=score_histogram(tot, score_column_name(OVERALL_COL)),
+        question_scores={c: score_mean(tot, score_column_name(c)) for c in LIKERT_COLUMNS},
+        intentions={c: flag_percent(tot, flag_column_name(c)) for c in INTENTION_COLS},
+        responses_by_department=by_department,
+        complaints=complaints,
+        suggestions=suggestions,
+    )
+
+
+def compare_departments(cube: pd.DataFrame, spec: FilterSpec, ci: bool = False) -> pd.DataFrame:
+    """ตารางเปรียบเทียบทุกหน่วยงาน (aggregates.compare_levels) ตามช่วงเวลาของ spec (ไม่ใช้ spec.department)"""
+    return compare_levels(slice_cube(cube, year=spec.year, quarter=spec.quarter, month=spec.month),
+                          'หน่วยงาน', ci=ci)
+
+
+class ResultCache:
+    """LRU ของ DashboardResult ต่อ FilterSpec (หนึ่ง cache ต่อ Snapshot จึงไม่ต้องล้างเมื่อข้อมูลเปลี่ยน)
+
+    key เป็นค่า hashable อื่นได้ด้วย (เช่น ตารางเปรียบเทียบหน่วยงานต่อ (FilterSpec, ci))
+    """
+
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items: 'OrderedDict[FilterSpec, DashboardResult]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, spec: FilterSpec, compute: Callable[[], DashboardResult]) -> DashboardResult:
+        with self._lock:
+            if spec in self._items:
+                self._items.move_to_end(spec)
+                self.hits += 1
+                return self._items[spec]
+            self.misses += 1
+        # คำนวณนอก lock: ผู้ชมคนอื่นที่ดูตัวกรองอื่นไม่ต้องรอ
+        result = compute()
+        with self._lock:
+            self._items[spec] = result
+            self._items.move_to_end(spec)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return result
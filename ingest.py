@@ -0,0 +1,555 @@
+# ==============================================================================
+# DATA INGESTION
+# ==============================================================================
+# อ่านไฟล์ export ของแบบประเมิน (Google Sheets CSV / xlsx) แล้วเตรียมข้อมูลสำหรับ Dashboard
+# - prepare_frame: เปลี่ยนชื่อคอลัมน์ แปลงวันที่ เพิ่มคอลัมน์คะแนน/flag ความคิดเห็น และแปลงเป็นชนิดข้อมูลขนาดเล็ก
+# - IncrementalLoader: เก็บข้อมูลที่เตรียมแล้วไว้ เมื่อแหล่งข้อมูลมีแถวเพิ่ม (ฟอร์มได้คำตอบใหม่)
+#   จะ parse และเตรียมเฉพาะแถวใหม่แล้วต่อท้าย แทนการเตรียมข้อมูลทั้งหมดใหม่ทุกครั้ง
+import hashlib
+import io
+import os
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from comments import COMMENT_COLS, add_comment_flags, has_comment_column_name
+from profiling import StageTimer
+from scoring import HISTORICAL_ANSWER_SCORES, add_score_columns, historical_answers_to_likert
+from snapshots import load_snapshot, save_snapshot
+
+try:
+    import pyarrow  # noqa: F401
+    TEXT_DTYPE = pd.StringDtype('pyarrow')
+except ImportError:  # ไม่มี pyarrow: ข้อความอิสระคงเป็น object
+    TEXT_DTYPE = None
+
+TIMESTAMP_COL = 'ประทับเวลา'
+
+# คอลัมน์ข้อความอิสระ (แทบไม่ซ้ำกัน) เก็บเป็นข้อความแบบ Arrow แทน category
+FREE_TEXT_COLS = [TIMESTAMP_COL, 'รายละเอียดความไม่พึงพอใจ', 'ความคาดหวังต่อบริการ',
+                  'ความคาดหวังต่อบริการของโรงพยาบาลในภาพรวม']
+
+COLUMN_MAPPING = {
+    'หอผู้ป่วยที่ท่านเข้ารับบริการ/ ต้องการประเมิน \n(เพื่อสะท้อนกลับหน่วยงานโดยตรง)': 'หน่วยงาน',
+    'ส่วนที่ 1 ข้อมูลทั่วไปของผู้ตอบแบบประเมิน\n1. เพศ': 'เพศ',
+    '2. อายุ': 'อายุ', '3. ภูมิลำเนา': 'ภูมิลำเนา', '4. อาชีพ': 'อาชีพ', '5. สิทธิในการรักษา': 'สิทธิการรักษา',
+    '6. วันที่มารับบริการ': 'วันที่รับบริการ',
+    'จำนวนวันนอนรักษาที่โรงพยาบาล': 'วันนอน',
+    'ความพึงพอใจต่อบริการของโรงพยาบาลในภาพรวม': 'ความพึงพอใจโดยรวม',
+    '2. ท่านคิดว่าสุขภาพโดยรวมของท่าน (ณ ตอนนี้) เป็นอย่างไร': 'สุขภาพโดยรวม',
+    'แบบประเมิน [1. ขั้นตอนการติดต่อและเข้ารับการรักษาในโรงพยาบาล (Admissions) มีความสะดวกเพียงใด]': 'Q1_ความสะดวกการรับบริการ',
+    'แบบประเมิน [2. ขณะนอนโรงพยาบาลครั้งนี้ แพทย์ พยาบาลและเจ้าหน้าที่ รับฟังและเปิดโอกาสให้ท่านซักถามข้อสงสัยได้มากน้อยเพียงใด]': 'Q2_การรับฟัง',
+    'แบบประเมิน [3. ขณะนอนโรงพยาบาลครั้งนี้ แพทย์ พยาบาลและเจ้าหน้าที่ให้ข้อมูลเกี่ยวกับขั้นตอนการรับบริการได้ชัดเจนเพียงใด]': 'Q3_ความชัดเจนข้อมูลบริการ',
+    'แบบประเมิน [4. ขณะนอนโรงพยาบาล ท่านรู้สึกว่าบุคลากรทุกคนดูแลท่านอย่างเท่าเทียมและให้เกียรติหรือไม่]': 'Q4_ความเท่าเทียม',
+    'แบบประเมิน [5. โรงพยาบาลมีความสะอาด และมีสิ่งอำนวยความสะดวกเพียงพอต่อความต้องการของท่าน]': 'Q5_ความสะอาดและสิ่งอำนวยความสะดวก',
+    'แบบประเมิน [6. เมื่อท่านต้องการความช่วยเหลือ (เช่น กดปุ่มเรียกพยาบาล) ท่านได้รับตอบสนองอย่างเหมาะสม]': 'Q6_การตอบสนอง',
+    'แบบประเมิน [7. ขณะนอนโรงพยาบาล ท่านได้รับข้อมูลเกี่ยวกับค่าใช้จ่ายที่อาจเกิดขึ้นอย่างต่อเนื่องและชัดเจนเพียงใด]': 'Q7_ข้อมูลค่าใช้จ่าย',
+    'แบบประเมิน [8. ขณะนอนโรงพยาบาล ท่านได้รับข้อมูลการรักษา อาการแทรกซ้อนระหว่างการรักษาพยาบาล]': 'Q8_ข้อมูลการรักษา',
+    'แบบประเมิน [9. ท่านและครอบครัว ได้มีส่วนร่วมในการวางแผนการรักษาและการปฏิบัติตัวร่วมกับ ทีมผู้ให้การรักษาอย่างเหมาะสมหรือไม่]': 'Q9_การมีส่วนร่วมวางแผน',
+    'แบบประเมิน [10. ท่านได้รับข้อมูลยา ผลข้างเคียงของยา และวิธีการใช้ยาอย่างชัดเจนเพียงใด]': 'Q10_ข้อมูลด้านยา',
+    '1. หากท่านมีอาการเจ็บป่วย ท่านจะพิจารณากลับมารับบริการ ที่โรงพยาบาลแห่งนี้หรือไม่': 'กลับมารับบริการหรือไม่',
+    '2. หากมีโอกาสท่านจะแนะนำผู้อื่นให้มารับบริการที่โรงพยาบาลแห่งนี้หรือไม่': 'แนะนำผู้อื่นหรือไม่',
+    '3. ท่านมีความไม่พึงพอใจในการมาใช้บริการที่โรงพยาบาลนี้หรือไม่': 'มีความไม่พึงพอใจหรือไม่',
+    '(หากมี) ความไม่พึงพอใจกรุณาระบุรายละเอียด เพื่อเป็นประโยชน์ในการปรับปรุง': 'รายละเอียดความไม่พึงพอใจ',
+    'ข้อเสนอแนะเพิ่มเติมเพื่อการพัฒนาคุณภาพโรงพยาบาล': 'ความคาดหวังต่อบริการ'
+}
+
+# หัวคอลัมน์ของแบบฟอร์มปีก่อน ๆ (ไฟล์ export mpxi*.xlsx) ที่เป็นคำถามเดียวกับ COLUMN_MAPPING
+# ข้อ 1-10 ไม่มี 'แบบประเมิน [...]' ครอบ ไฟล์ที่มีทั้งสองแบบจะถูกรวมเป็นคอลัมน์เดียวใน rename_columns
+_FORM_PREFIX = 'แบบประเมิน ['
+COLUMN_ALIASES = {
+    **{raw[len(_FORM_PREFIX):-1].strip(): name for raw, name in COLUMN_MAPPING.items() if raw.startswith(_FORM_PREFIX)},
+    '4. อายุ': 'อายุ', '5. ภูมิลำเนา': 'ภูมิลำเนา', '6. อาชีพ': 'อาชีพ', '7. สิทธิในการรักษา': 'สิทธิการรักษา',
+    '8. วันที่มารับบริการ': 'วันที่รับบริการ',
+    '9.จำนวนวันนอนรักษาที่โรงพยาบาล': 'วันนอน',
+    'ส่วนที่ 2 ความพึงพอใจต่อบริการของโรงพยาบาลในภาพรวม': 'ความพึงพอใจโดยรวม',
+    '2. ท่านคิดว่าสุขภาพโดยรวมของท่านเป็นอย่างไร': 'สุขภาพโดยรวม',
+    'ความคาดหวังต่อบริการของโรงพยาบาลในภาพรวม': 'ความคาดหวังต่อบริการ',
+}
+
+# เพิ่มเมื่อผลของ prepare_frame เปลี่ยน (ชื่อ/ชนิดคอลัมน์): cache ของแหล่งข้อมูลและ snapshot รุ่นเก่าจะไม่ถูกใช้
+PREPARE_VERSION = 3
+
+
+def sheet_csv_url(sheet_id: str, gid: str) -> str:
+    """URL export CSV ของแท็บ (gid) หนึ่งใน Google Sheets"""
+    return f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv&gid={gid}"
+
+
+def is_remote(source: Any) -> bool:
+    return isinstance(source, str) and source.lower().startswith(('http://', 'https://'))
+
+
+def source_name(source: Any) -> str:
+    return source if isinstance(source, str) else getattr(source, 'name', '')
+
+
+def read_bytes(source: Any) -> bytes:
+    """เนื้อหาทั้งหมดของแหล่งข้อมูล (URL, path หรือไฟล์ที่อัปโหลด)"""
+    if is_remote(source):
+        with urllib.request.urlopen(source, timeout=30) as resp:
+            return resp.read()
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            return f.read()
+    if hasattr(source, 'getvalue'):
+        return source.getvalue()
+    return source.read()
+
+
+def read_source(source: Any) -> pd.DataFrame:
+    if source_name(source).lower().endswith('.xlsx'):
+        return pd.read_excel(source)
+    return pd.read_csv(source)
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """แปลงข้อมูลที่เตรียมแล้วเป็นชนิดข้อมูลขนาดเล็ก (ค่าทุกเซลล์เท่าเดิม)
+
+    - คำตอบแบบตัวเลือก (Likert, หน่วยงาน, ใช่/ไม่ใช่, ข้อมูลทั่วไป) → category
+      (รวมคอลัมน์ที่มีหลายชนิดปนกัน เช่น วันนอน = 3 / '4 คืน' โดย category ยังเก็บค่าเดิมไว้)
+    - ข้อความอิสระใน FREE_TEXT_COLS → ข้อความแบบ Arrow (ไม่ใช่ Python object ทีละเซลล์)
+    - ตัวเลขจำนวนเต็ม → int ขนาดเล็กที่สุด
+    """
+    out = {}
+    for col in df.columns:
+        s = df[col]
+        if s.dtype == object:
+            kind = pd.api.types.infer_dtype(s, skipna=True)
+            if col in FREE_TEXT_COLS:
+                if TEXT_DTYPE is not None and kind in ('string', 'empty'):
+                    out[col] = s.astype(TEXT_DTYPE)
+            elif kind != 'empty':
+                out[col] = s.astype('category')
+        elif pd.api.types.is_integer_dtype(s.dtype) and isinstance(s.dtype, np.dtype):
+            out[col] = pd.to_numeric(s, downcast='integer')
+    return df.assign(**out) if out else df
+
+
+def _as_category(s: pd.Series) -> Optional[pd.Series]:
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return s
+    if s.dtype == object:
+        return s.astype('category')
+    return None
+
+
+def append_frames(frame: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """ต่อแถวใหม่ท้ายข้อมูลเดิม โดยรวม categories ให้ตรงกันก่อน (category ต่างชุดกันจะกลายเป็น object)"""
+    if frame.empty:
+        return new
+    fixed_old, fixed_new = {}, {}
+    for col in frame.columns.intersection(new.columns):
+        a, b = frame[col], new[col]
+        if a.dtype == b.dtype:
+            continue
+        if b.isna().all() and (a.dtype.kind not in 'iub' or not len(b)):
+            # คอลัมน์ที่ว่างทั้งหมดในชุดใหม่ (ชุดเล็ก ๆ) ใช้ชนิดเดียวกับข้อมูลเดิม
+            fixed_new[col] = b.astype(a.dtype)
+            continue
+        if not (isinstance(a.dtype, pd.CategoricalDtype) or isinstance(b.dtype, pd.CategoricalDtype)):
+            continue
+        a, b = _as_category(a), _as_category(b)
+        if a is None or b is None:
+            continue
+        if not a.cat.categories.equals(b.cat.categories):
+            # เรียง categories แบบเดียวกับ astype('category') ของข้อมูลทั้งชุด (รองรับค่าหลายชนิดปนกัน)
+            cats = a.cat.categories.append(b.cat.categories).to_series().astype('category').cat.categories
+            a, b = a.cat.set_categories(cats), b.cat.set_categories(cats)
+        fixed_old[col], fixed_new[col] = a, b
+    if fixed_old:
+        frame = frame.assign(**fixed_old)
+    if fixed_new:
+        new = new.assign(**fixed_new)
+    return pd.concat([frame, new])
+
+
+def rename_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """เปลี่ยนชื่อคอลัมน์ตาม COLUMN_MAPPING/COLUMN_ALIASES
+
+    คำตอบใต้หัวคอลัมน์เก่าของข้อ Likert แปลงเป็นระดับ Likert ก่อน (scoring.historical_answers_to_likert)
+    หลายหัวคอลัมน์ที่เป็นคำถามเดียวกันรวมเป็นคอลัมน์เดียว: ใช้ค่าของหัวคอลัมน์ใน COLUMN_MAPPING ก่อน
+    แล้วเติมช่องว่างจากหัวคอลัมน์อื่นตามลำดับในไฟล์
+    """
+    raw = [str(c).strip() for c in df.columns]
+    names = [COLUMN_MAPPING.get(c) or COLUMN_ALIASES.get(c, c) for c in raw]
+    historical = [c not in COLUMN_MAPPING and c in COLUMN_ALIASES and name in HISTORICAL_ANSWER_SCORES
+                  for c, name in zip(raw, names)]
+    if len(set(names)) == len(names) and not any(historical):
+        return df.set_axis(names, axis=1)
+    columns: Dict[str, pd.Series] = {}
+    for i in sorted(range(len(names)), key=lambda i: raw[i] not in COLUMN_MAPPING):
+        col, first = df.iloc[:, i], columns.get(names[i])
+        if historical[i]:
+            col = historical_answers_to_likert(col, names[i])
+        columns[names[i]] = col if first is None else first.where(first.notna(), col)
+    return pd.DataFrame({name: columns[name] for name in dict.fromkeys(names)}, index=df.index)
+
+
+def add_date_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """แปลง 'ประทับเวลา' เป็น date_col (ตัดแถวที่แปลงไม่ได้) และเพิ่ม เดือน/ไตรมาส/ปี"""
+    if TIMESTAMP_COL in df.columns:
+        df['date_col'] = pd.to_datetime(df[TIMESTAMP_COL], dayfirst=True, errors='coerce')
+        df = df.dropna(subset=['date_col'])
+        df['เดือน'] = df['date_col'].dt.month
+        df['ไตรมาส'] = df['date_col'].dt.quarter
+        df['ปี'] = df['date_col'].dt.year
+    else:
+        df['date_col'] = pd.NaT
+        df['เดือน'] = None
+        df['ไตรมาส'] = None
+        df['ปี'] = None
+    return df
+
+
+def prepare_frame(df: pd.DataFrame, compact: bool = True, timer: Optional[StageTimer] = None) -> pd.DataFrame:
+    """เปลี่ยนชื่อคอลัมน์ตาม COLUMN_MAPPING, แปลง 'ประทับเวลา', เพิ่มคอลัมน์คะแนน แล้ว compact_frame"""
+    timer = timer or StageTimer('prepare')
+    with timer.stage('rename'):
+        df = rename_columns(df)
+    with timer.stage('dates'):
+        df = add_date_columns(df)
+    # คะแนนทุกข้อคำนวณครั้งเดียวต่อการโหลดข้อมูล (rerun ใช้คอลัมน์เหล่านี้โดยตรง)
+    with timer.stage('score'):
+        df = add_score_columns(df)
+    with timer.stage('comments'):
+        df = add_comment_flags(df)
+    if compact:
+        with timer.stage('compact'):
+            df = compact_frame(df)
+    return df
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _raw_stamp(raw: pd.DataFrame, pos: int) -> Optional[str]:
+    # ค่า 'ประทับเวลา' ดิบ (ก่อน rename/แปลงวันที่) ใช้ยืนยันว่าแถวเดิมยังอยู่ที่ตำแหน่งเดิม
+    cols = [c for c in raw.columns if str(c).strip() == TIMESTAMP_COL]
+    if not cols or not len(raw):
+        return None
+    return str(raw[cols[0]].iloc[pos])
+
+
+class IncrementalLoader:
+    """โหลดแหล่งข้อมูลเดียวซ้ำ ๆ โดยเตรียมเฉพาะแถวที่เพิ่มเข้ามาตั้งแต่ครั้งก่อน
+
+    แบบฟอร์มเพิ่มคำตอบต่อท้ายเสมอ เมื่อ poll() จึง parse CSV โดยข้าม (skiprows) แถวที่เคยอ่านแล้ว
+    ยกเว้นแถวสุดท้ายที่ใช้เป็นจุดยึด ก่อนหน้านั้นตรวจว่าไบต์ส่วนที่อ่านแล้วยังเหมือนเดิมทุกตัว (hash) ถ้ามีการ
+    ลบ/แก้ไขคำตอบเดิม/เรียงแถวใหม่ หรือ 'ประทับเวลา' ของจุดยึดไม่ตรง จะโหลดทั้งหมดใหม่ เนื้อหาเท่าเดิมทุกไบต์
+    ไม่ต้อง parse เลย ไฟล์ xlsx และไฟล์ในเครื่องที่ไม่เปลี่ยน (mtime/ขนาดเท่าเดิม) ไม่ต้องอ่านใหม่
+    """
+
+    def __init__(self, source: Any):
+        self.source = source
+        self.frame = pd.DataFrame()
+        self.raw_rows = 0
+        self.full_loads = 0
+        self.incremental_loads = 0
+        self.unchanged_polls = 0  # ไฟล์ในเครื่องไม่เปลี่ยน: ไม่ได้อ่าน/parse เลย
+        # poll ล่าสุดต่อแถวใหม่ท้ายข้อมูลเดิม: ตำแหน่งแถวแรกที่เพิ่ม (None = โหลดใหม่ทั้งหมด/ไม่เปลี่ยน)
+        self.appended_from: Optional[int] = None
+        self._anchor: Optional[str] = None
+        # ขนาดและ hash ของเนื้อหา CSV ที่อ่านแล้ว: ไบต์ช่วงนี้ต้องไม่เปลี่ยน (แก้ไข/ลบแถวเดิม → โหลดใหม่ทั้งหมด)
+        self._prefix: Optional[Tuple[int, str]] = None
+        self._signature: Optional[Tuple[int, int]] = None
+        # ข้อผิดพลาดของแหล่งย่อย (เข้ากับ MultiSourceLoader.errors) แหล่งเดียวที่โหลดไม่สำเร็จจะ raise จึงว่างเสมอ
+        self.errors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def state(self) -> Dict[str, Any]:
+        """ตำแหน่งที่อ่านถึงแล้ว (เก็บคู่กับ snapshot เพื่อให้ poll ครั้งถัดไปหลัง restart ยังอ่านเพิ่มทีละส่วน)
+
+        signature (mtime, ขนาด) ของไฟล์ในเครื่อง: ไฟล์ที่ไม่เปลี่ยนหลัง restart ไม่ต้อง parse ใหม่
+        """
+        return {'raw_rows': self.raw_rows, 'anchor': self._anchor,
+                'prefix': list(self._prefix) if self._prefix else None,
+                'signature': list(self._signature) if self._signature else None}
+
+    def restore(self, frame: pd.DataFrame, state: Dict[str, Any]) -> None:
+        with self._lock:
+            self.frame = frame
+            self.raw_rows = int(state.get('raw_rows') or 0)
+            self._anchor = state.get('anchor')
+            prefix = state.get('prefix')
+            self._prefix = tuple(prefix) if prefix else None
+            signature = state.get('signature')
+            self._signature = tuple(signature) if signature else None
+
+    def _file_signature(self) -> Optional[Tuple[int, int]]:
+        if isinstance(self.source, str) and not is_remote(self.source) and os.path.exists(self.source):
+            st = os.stat(self.source)
+            return st.st_mtime_ns, st.st_size
+        return None
+
+    def stats(self) -> Dict[str, int]:
+        return {'full': self.full_loads, 'incremental': self.incremental_loads,
+                'unchanged': self.unchanged_polls, 'rows': len(self.frame)}
+
+    def poll(self, timer: Optional[StageTimer] = None) -> pd.DataFrame:
+        """คืนข้อมูลที่เตรียมแล้วล่าสุด (เตรียมเพิ่มเฉพาะแถวใหม่ถ้าทำได้)
+
+        timer: ถ้าระบุ จะบันทึกเวลา fetch/parse/rename/dates/score/compact/append และโหมดการโหลด
+        """
+        timer = timer or StageTimer('poll')
+        with self._lock:
+            signature = self._file_signature()
+            self.appended_from = None
+            if signature is not None and signature == self._signature:
+                self.unchanged_polls += 1
+                timer.info['load'] = 'unchanged'
+                return self.frame
+            if source_name(self.source).lower().endswith('.xlsx'):
+                with timer.stage('parse'):
+                    raw = read_source(self.source)
+                self._load_full(raw, timer)
+            else:
+                with timer.stage('fetch'):
+                    data = read_bytes(self.source)
+                self._load_csv(data, timer)
+            self._signature = signature
+            return self.frame
+
+    def _load_full(self, raw: pd.DataFrame, timer: StageTimer) -> None:
+        self.frame = prepare_frame(raw, timer=timer)
+        self.raw_rows = len(raw)
+        self._anchor = _raw_stamp(raw, -1)
+        self.full_loads += 1
+        timer.info.update(load='full', new_rows=len(raw))
+
+    def _load_csv(self, data: bytes, timer: StageTimer) -> None:
+        known = self.raw_rows
+        prefix = self._prefix
+        with timer.stage('verify'):
+            # แถวที่อ่านแล้วต้องเป็นไบต์ชุดเดิมทุกตัว (ไม่ใช่แค่ 'ประทับเวลา' ของแถวสุดท้าย)
+            same_prefix = prefix is not None and len(data) >= prefix[0] and _digest(data[:prefix[0]]) == prefix[1]
+        if same_prefix and len(data) == prefix[0]:
+            self.unchanged_polls += 1
+            timer.info['load'] = 'unchanged'
+            return
+        if known and self._anchor is not None and same_prefix:
+            # อ่านตั้งแต่แถวสุดท้ายที่รู้จัก (ตำแหน่ง known - 1) เป็นต้นไป
+            with timer.stage('parse'):
+                tail = pd.read_csv(io.BytesIO(data), skiprows=range(1, known))
+            if len(tail) and _raw_stamp(tail, 0) == self._anchor:
+                tail.index = pd.RangeIndex(known - 1, known - 1 + len(tail))
+                new_rows = tail.iloc[1:]
+                if len(new_rows):
+                    prepared = prepare_frame(new_rows, timer=timer)
+                    self.appended_from = len(self.frame)
+                    with timer.stage('append'):
+                        self.frame = append_frames(self.frame, prepared)
+                    self.raw_rows = known + len(new_rows)
+                    self._anchor = _raw_stamp(new_rows, -1)
+                self._prefix = (len(data), _digest(data))
+                self.incremental_loads += 1
+                timer.info.update(load='incremental', new_rows=len(new_rows))
+                return
+        with timer.stage('parse'):
+            raw = pd.read_csv(io.BytesIO(data))
+        self._load_full(raw, timer)
+        self._prefix = (len(data), _digest(data))
+
+
+# ==============================================================================
+# MULTIPLE SOURCES
+# ==============================================================================
+# แบบฟอร์มแยกตามปีงบประมาณ: ชีตของปีปัจจุบัน + ชีต/ไฟล์ export (xlsx, CSV) ของปีก่อน ๆ
+# แต่ละแหล่งมี IncrementalLoader ของตัวเอง (poll พร้อมกันใน thread pool เพราะเวลาส่วนใหญ่คือรอเครือข่าย/ดิสก์)
+# แล้วรวมเป็นชุดเดียวโดยตัดคำตอบที่ซ้ำกับแหล่งก่อนหน้า (วันเวลาประทับถึงวินาที + หน่วยงาน เดียวกัน) ข้อมูลที่เตรียมแล้วของแต่ละแหล่ง
+# ถูกเก็บเป็นไฟล์ Feather ใน cache_dir ไฟล์ปีเก่าที่ไม่เปลี่ยนจึงไม่ถูก parse อีกแม้ restart
+DEDUP_COLS = ['date_col', 'หน่วยงาน']
+SourceSpec = Union[str, Sequence[str]]
+
+
+def source_label(source: SourceSpec) -> str:
+    """ชื่อแหล่งข้อมูลสำหรับแสดงผล/เป็น key (หลายแหล่ง: ชื่อทุกแหล่งคั่นด้วย ' + ')"""
+    return source if isinstance(source, str) else ' + '.join(source_name(s) for s in source)
+
+
+def parse_sources(value: str) -> List[str]:
+    """รายการแหล่งข้อมูลจากข้อความ (คั่นด้วย ';' หรือขึ้นบรรทัดใหม่) เช่น ค่าของ MPX_SOURCES"""
+    return [part.strip() for line in value.splitlines() for part in line.split(';') if part.strip()]
+
+
+def response_keys(frame: pd.DataFrame) -> np.ndarray:
+    """hash ของ (date_col ปัดเป็นวินาที, หน่วยงาน) ต่อแถว ใช้ตัดคำตอบซ้ำระหว่างแหล่ง"""
+    cols = [c for c in DEDUP_COLS if c in frame.columns]
+    keys = frame[cols]
+    if 'date_col' in cols and pd.api.types.is_datetime64_any_dtype(keys['date_col']):
+        # ไฟล์ xlsx เก็บเวลาถึงมิลลิวินาที แต่ CSV ของ Google Sheets ละเอียดถึงวินาที: ปัดลงเป็นวินาทีก่อน
+        keys = keys.assign(date_col=keys['date_col'].dt.floor('s'))
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+
+def _fix_comment_flags(frame: pd.DataFrame) -> pd.DataFrame:
+    # แหล่งที่ไม่มีคอลัมน์ความคิดเห็นทำให้ flag '__has' ของแถวเหล่านั้นเป็น NaN หลังต่อกัน
+    fixed = {flag: frame[flag].fillna(False).astype(bool)
+             for flag in map(has_comment_column_name, COMMENT_COLS)
+             if flag in frame.columns and frame[flag].dtype != bool}
+    return frame.assign(**fixed) if fixed else frame
+
+
+def merge_frames(frames: Sequence[pd.DataFrame]) -> Tuple[pd.DataFrame, np.ndarray]:
+    """ต่อข้อมูลที่เตรียมแล้วหลายชุดตามลำดับ โดยตัดคำตอบที่มีอยู่แล้วในแหล่งก่อนหน้า (เก็บแถวที่พบก่อน)
+
+    แถวที่ key ซ้ำกันภายในแหล่งเดียวกัน (ส่งแบบฟอร์มวินาทีเดียวกันจากหอผู้ป่วยเดียวกัน) เป็นคนละคำตอบ
+    จึงไม่ถูกตัด เหมือนการโหลดแหล่งเดียว แถวที่ไม่มีวันเวลาประทับไม่ถูกตัด
+    คืน (ข้อมูล, response_keys ของทุกแหล่งยกเว้นแหล่งสุดท้าย) ใช้ตัดแถวที่ต่อท้ายแหล่งสุดท้ายภายหลัง
+    """
+    earlier = np.empty(0, dtype=np.uint64)
+    merged: Optional[pd.DataFrame] = None
+    for i, f in enumerate(frames):
+        if f.empty:
+            continue
+        keys = response_keys(f)
+        keep = ~np.isin(keys, earlier)
+        if 'date_col' in f.columns:
+            keep |= f['date_col'].isna().to_numpy()
+        if i < len(frames) - 1:
+            earlier = np.concatenate([earlier, keys])
+        part = f if keep.all() else f[keep]
+        merged = part if merged is None else append_frames(merged, part)
+    if merged is None:
+        return pd.DataFrame(), earlier
+    return _fix_comment_flags(merged).reset_index(drop=True), earlier
+
+
+def source_cache_path(cache_dir: str, source: str) -> str:
+    return os.path.join(cache_dir, hashlib.sha1(source.encode('utf-8')).hexdigest()[:16] + '.feather')
+
+
+class MultiSourceLoader:
+    """รวมหลายแหล่งข้อมูลเป็นชุดเดียว (ใช้แทน IncrementalLoader ได้: poll/stats/state/restore/appended_from)
+
+    - แหล่งที่ไม่เปลี่ยนคืน frame เดิม ถ้าทุกแหล่งไม่เปลี่ยน poll คืน frame รวมชุดเดิม (ไม่ต้องรวมใหม่)
+    - มีเพียงแหล่งสุดท้าย (มักเป็นชีตของปีปัจจุบัน) ที่ได้แถวต่อท้าย: ต่อเฉพาะแถวใหม่ที่ไม่ซ้ำกับแหล่งก่อนหน้าท้ายชุดรวม
+      และตั้ง appended_from เหมือน IncrementalLoader (Snapshot จึงทำดัชนี/trend เพิ่มเฉพาะแถวใหม่)
+    - แหล่งที่โหลดไม่สำเร็จแต่เคยโหลดได้: ใช้ข้อมูลชุดก่อนของแหล่งนั้น (ข้อผิดพลาดอยู่ใน errors)
+    """
+
+    def __init__(self, sources: Sequence[str], cache_dir: Optional[str] = None, max_workers: int = 4):
+        self.sources = list(sources)
+        self.source = source_label(self.sources)
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.loaders = {s: IncrementalLoader(s) for s in self.sources}
+        self.frame = pd.DataFrame()
+        self.appended_from: Optional[int] = None
+        self.errors: Dict[str, str] = {}
+        self._earlier_keys = np.empty(0, dtype=np.uint64)  # response_keys ของทุกแหล่งยกเว้นแหล่งสุดท้าย
+        self._frames: Optional[List[pd.DataFrame]] = None  # frame ของแต่ละแหล่งที่ใช้รวมครั้งล่าสุด
+        self._restored: set = set()
+        self._lock = threading.Lock()
+
+    def stats(self) -> Dict[str, int]:
+        totals = {'full': 0, 'incremental': 0, 'unchanged': 0}
+        for loader in self.loaders.values():
+            for k, v in loader.stats().items():
+                if k in totals:
+                    totals[k] += v
+        return {**totals, 'rows': len(self.frame)}
+
+    def state(self) -> Dict[str, Any]:
+        # ตำแหน่งที่อ่านถึงของแต่ละแหล่งอยู่ในไฟล์ cache ของแหล่งนั้น
+        return {'sources': self.sources}
+
+    def restore(self, frame: pd.DataFrame, state: Dict[str, Any]) -> None:
+        """ใช้ข้อมูลรวมจาก snapshot ระหว่างรอ poll แรก (poll แรกจะรวมใหม่จาก cache ของแต่ละแหล่ง)"""
+        with self._lock:
+            self.frame = frame
+
+    def _restore_cached(self, source: str) -> None:
+        if self.cache_dir is None or source in self._restored:
+            return
+        self._restored.add(source)
+        stored = load_snapshot(source_cache_path(self.cache_dir, source))
+        if (stored is not None and stored[1].get('source') == source
+                and stored[1].get('version') == PREPARE_VERSION):
+            self.loaders[source].restore(stored[0], stored[1].get('loader', {}))
+
+    def _poll_source(self, source: str) -> Tuple[pd.DataFrame, StageTimer, Optional[str]]:
+        loader = self.loaders[source]
+        timer = StageTimer('source')
+        try:
+            with timer.stage('cache_load'):
+                self._restore_cached(source)
+            before = loader.frame  # หลัง restore: แหล่งที่ไม่เปลี่ยนตั้งแต่ cache จึงไม่ต้องเขียน cache ซ้ำ
+            frame = loader.poll(timer)
+        except Exception as e:
+            return loader.frame, timer, str(e)
+        if self.cache_dir is not None and frame is not before and not frame.empty:
+            try:
+                with timer.stage('cache_save'):
+                    save_snapshot(frame, {'source': source, 'version': PREPARE_VERSION, 'loader': loader.state()},
+                                  source_cache_path(self.cache_dir, source))
+            except Exception as e:
+                # เขียน cache ไม่ได้ไม่กระทบข้อมูลที่โหลดแล้ว
+                timer.info['cache_error'] = str(e)
+        return frame, timer, None
+
+    def poll(self, timer: Optional[StageTimer] = None) -> pd.DataFrame:
+        """โหลดทุกแหล่งพร้อมกันแล้วคืนข้อมูลรวมล่าสุด
+
+        timer: บันทึกเวลารวมของการโหลด ('sources') และการรวม ('merge') รายละเอียดต่อแหล่งอยู่ใน
+        timer.info['sources'] (โหมดการโหลด จำนวนแถวใหม่ และเวลาเป็นวินาที)
+        """
+        timer = timer or StageTimer('poll')
+        with self._lock:
+            self.appended_from = None
+            with timer.stage('sources'):
+                with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(self.sources))),
+                                        thread_name_prefix='mpx-source') as pool:
+                    polled = list(pool.map(self._poll_source, self.sources))
+            self.errors = {s: err for s, (_, _, err) in zip(self.sources, polled) if err}
+            timer.info['sources'] = {s: {**t.info, 'seconds': round(t.elapsed(), 6)}
+                                     for s, (_, t, _) in zip(self.sources, polled)}
+            if self.errors:
+                timer.info['source_errors'] = self.errors
+            frames = [f for f, _, _ in polled]
+            if all(f.empty for f in frames):
+                raise ValueError('; '.join(f'{s}: {e}' for s, e in self.errors.items()) or 'Empty Data')
+
+            prev = self._frames
+            if prev is not None and all(f is p for f, p in zip(frames, prev)):
+                timer.info['load'] = 'unchanged'
+                return self.frame
+            last = self.loaders[self.sources[-1]]
+            with timer.stage('merge'):
+                if (prev is not None and all(f is p for f, p in zip(frames[:-1], prev[:-1]))
+                        and last.appended_from is not None and last.appended_from == len(prev[-1])):
+                    self._append(frames[-1].iloc[last.appended_from:])
+                    timer.info['load'] = 'incremental'
+                else:
+                    self.frame, self._earlier_keys = merge_frames(frames)
+                    timer.info['load'] = 'full'
+            self._frames = frames
+            timer.info['new_rows'] = sum(t.info.get('new_rows', 0) for _, t, _ in polled)
+            return self.frame
+
+    def _append(self, new: pd.DataFrame) -> None:
+        keep = ~np.isin(response_keys(new), self._earlier_keys)
+        if 'date_col' in new.columns:
+            keep |= new['date_col'].isna().to_numpy()
+        if not keep.any():
+            return
+        new = new[keep]
+        start = len(self.frame)
+        new = new.set_axis(pd.RangeIndex(start, start + len(new)))
+        # แก้ flag หลังต่อกัน: แหล่งสุดท้ายที่ไม่มีคอลัมน์ความคิดเห็นให้ flag เป็น NaN (object) หลัง concat
+        self.frame = _fix_comment_flags(append_frames(self.frame, new))
+        self.appended_from = start
+
+
+def make_loader(source: SourceSpec, cache_dir: Optional[str] = None) -> Union[IncrementalLoader, MultiSourceLoader]:
+    """IncrementalLoader ของแหล่งเดียว หรือ MultiSourceLoader เมื่อ source เป็นรายการหลายแหล่ง"""
+    if isinstance(source, str):
+        return IncrementalLoader(source)
+    if len(source) == 1:
+        return IncrementalLoader(source[0])
+    return MultiSourceLoader(source, cache_dir=cache_dir)
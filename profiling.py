@@ -0,0 +1,84 @@
+# ==============================================================================
+# STAGE TIMING
+# ==============================================================================
+# จับเวลาแต่ละขั้นตอนของงานหนึ่งรอบ: การโหลด/เตรียมข้อมูลใน thread เบื้องหลัง ('refresh')
+# และการ rerun หน้า Dashboard ('rerun') ทุกรอบถูกเขียนเป็น log JSON หนึ่งบรรทัด (logger 'mpx.timing')
+# และเก็บ N รอบล่าสุดไว้ในหน่วยความจำให้แผง profiling ใน sidebar
+# (เปิดด้วย ?profile=1 หรือ MPX_PROFILE=1) การจับเวลาเองมีต้นทุนระดับไมโครวินาทีจึงเปิดไว้เสมอ
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Mapping, Optional
+
+logger = logging.getLogger('mpx.timing')
+
+PROFILE_ENV = 'MPX_PROFILE'
+PROFILE_PARAM = 'profile'
+HISTORY = int(os.environ.get('MPX_PROFILE_HISTORY', '20'))
+
+
+class StageTimer:
+    """เวลาต่อขั้นตอนของงานหนึ่งรอบ (ชื่อขั้นตอนซ้ำกันจะรวมเวลาเข้าด้วยกัน)"""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.started_at = time.time()
+        self.stages: Dict[str, float] = {}
+        self.info: Dict[str, Any] = {}
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - t0
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._t0
+
+    def record(self) -> Dict[str, Any]:
+        return {'event': self.kind, 'at': round(self.started_at, 3), 'total': round(self.elapsed(), 6),
+                'stages': {k: round(v, 6) for k, v in self.stages.items()}, **self.info}
+
+
+class TimingLog:
+    """N รอบล่าสุดของแต่ละชนิดงาน (ใช้ร่วมกันทั้ง process: thread เบื้องหลังและทุก session)"""
+
+    def __init__(self, maxlen: int = HISTORY):
+        self._records: Dict[str, deque] = {}
+        self._maxlen = maxlen
+        self._lock = threading.Lock()
+
+    def add(self, timer: StageTimer) -> Dict[str, Any]:
+        rec = timer.record()
+        with self._lock:
+            self._records.setdefault(timer.kind, deque(maxlen=self._maxlen)).append(rec)
+        logger.info(json.dumps(rec, ensure_ascii=False))
+        return rec
+
+    def recent(self, kind: str) -> List[Dict[str, Any]]:
+        """รอบล่าสุดก่อน"""
+        with self._lock:
+            return list(reversed(self._records.get(kind, ())))
+
+
+TIMINGS = TimingLog()
+
+if os.environ.get(PROFILE_ENV) and not logger.handlers:
+    # เปิด profiling ผ่านตัวแปรแวดล้อม: พิมพ์ log เวลาออก stderr ด้วย (ปกติขึ้นกับการตั้งค่า logging ของผู้ใช้)
+    logger.addHandler(logging.StreamHandler())
+    logger.setLevel(logging.INFO)
+
+
+def enabled(query_params: Optional[Mapping[str, str]] = None) -> bool:
+    """เปิดแผง profiling หรือไม่ (ตัวแปรแวดล้อม MPX_PROFILE หรือ query param ?profile=1)"""
+    flag = os.environ.get(PROFILE_ENV, '')
+    if query_params is not None:
+        flag = query_params.get(PROFILE_PARAM, flag)
+    return str(flag).lower() in ('1', 'true', 'yes', 'on')
@@ -0,0 +1,222 @@
+# ==============================================================================
+# BACKGROUND REFRESH (stale-while-revalidate)
+# ==============================================================================
+# thread เบื้องหลังหนึ่งตัวต่อ process ดึงและเตรียมข้อมูลชุดถัดไปทุก interval วินาที
+# ระหว่างนั้นผู้ชมทุกคนยังได้ Snapshot ล่าสุดที่ใช้ได้ เมื่อชุดใหม่พร้อมจึงสลับ reference ทีเดียว
+# (การกำหนดค่า attribute ใน Python เป็น atomic) หน้าเว็บจึงไม่ต้องรอ Google Sheets อีก
+# ข้อมูลจากแหล่งหลักที่โหลดสำเร็จถูกเก็บเป็น snapshot ไบนารี (snapshots.py) ไว้ใช้ตอน cold start
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from aggregates import TREND_FREQS, build_cube, build_trend, merge_trend, trend_series
+from comments import CommentIndex, CommentRows, add_comment_flags
+from compute import DashboardResult, FilterSpec, ResultCache, compare_departments, compute_dashboard
+from ingest import PREPARE_VERSION, SourceSpec, make_loader, source_label
+from profiling import TIMINGS, StageTimer
+from snapshots import load_snapshot, save_snapshot
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    frame: pd.DataFrame
+    cube: pd.DataFrame
+    source: str
+    is_fallback: bool
+    loaded_at: float
+    error: Optional[str] = None  # ข้อผิดพลาดล่าสุดของแหล่งข้อมูลหลัก (ถ้ามี)
+    # แหล่งย่อยที่โหลดไม่สำเร็จรอบล่าสุด -> ข้อผิดพลาด (ข้อมูลของแหล่งนั้นเป็นชุดก่อนหน้า/ไม่มี)
+    source_errors: Dict[str, str] = field(default_factory=dict)
+    results: ResultCache = field(default_factory=ResultCache, compare=False, repr=False)
+    comments: CommentIndex = field(default_factory=CommentIndex, compare=False, repr=False)
+    trends: Dict[str, pd.DataFrame] = field(default_factory=dict, compare=False, repr=False)  # ความถี่ -> trend
+    comparisons: ResultCache = field(default_factory=lambda: ResultCache(16), compare=False, repr=False)
+
+    def dashboard(self, spec: FilterSpec) -> DashboardResult:
+        """ผลคำนวณของหน้า Dashboard ต่อชุดตัวกรอง (memoize ใน results)"""
+        return self.results.get(spec, lambda: compute_dashboard(self.frame, self.cube, spec))
+
+    def compare(self, spec: FilterSpec, ci: bool = False) -> pd.DataFrame:
+        """ตารางเปรียบเทียบทุกหน่วยงานตามช่วงเวลาของ spec (memoize ใน comparisons)"""
+        period = replace(spec, department=None)
+        return self.comparisons.get((period, ci), lambda: compare_departments(self.cube, period, ci))
+
+    def search_comments(self, query: str, within: CommentRows) -> CommentRows:
+        """ความคิดเห็นใน within ที่มีคำค้น query (ใช้ดัชนีของ Snapshot นี้)"""
+        return self.comments.search(self.frame, query, within)
+
+    def trend(self, freq: str = 'M', department: Optional[str] = None, window: int = 1) -> pd.DataFrame:
+        """ค่ารายช่วงเวลา (ดู aggregates.trend_series) จาก trend ที่สร้างไว้ตอนโหลด"""
+        return trend_series(self.trends.get(freq, pd.DataFrame()), freq, department, window)
+
+    def age_seconds(self, now: Optional[float] = None) -> float:
+        return max(0.0, (now if now is not None else time.time()) - self.loaded_at)
+
+
+class SnapshotRefresher:
+    """เตรียม Snapshot ของแหล่งข้อมูลหลัก (หรือไฟล์สำรอง) ใน thread เบื้องหลัง
+
+    - ดึงแหล่งหลักไม่สำเร็จแต่มี Snapshot จากแหล่งหลักอยู่แล้ว: ใช้ชุดเดิมต่อ (อายุข้อมูลจะเพิ่มขึ้น)
+    - ยังไม่เคยดึงแหล่งหลักสำเร็จ: ใช้ไฟล์สำรองแทน และลองแหล่งหลักใหม่ในรอบถัดไป
+    - มี snapshot_path: ตอนเริ่ม process จะใช้ snapshot ล่าสุดของแหล่งหลักทันที (ก่อนดึงข้อมูลจริง)
+      และเขียน snapshot ใหม่ทุกครั้งที่ข้อมูลแหล่งหลักเปลี่ยน
+    - source เป็นรายการได้ (ingest.MultiSourceLoader): โหลดทุกแหล่งพร้อมกันแล้วรวมเป็นชุดเดียว
+      โดยเก็บข้อมูลที่เตรียมแล้วของแต่ละแหล่งไว้ใน source_cache_dir
+    """
+
+    def __init__(self, source: SourceSpec, fallback: Optional[str] = None, interval: float = 300.0,
+                 snapshot_path: Optional[str] = None, source_cache_dir: Optional[str] = None):
+        self.sources = source
+        self.source = source_label(source)
+        self.source_cache_dir = source_cache_dir
+        self.fallback = fallback
+        self.interval = interval
+        self.snapshot_path = snapshot_path
+        self.last_error: Optional[str] = None
+        self._loaders: Dict[str, Any] = {}  # ชื่อแหล่ง -> IncrementalLoader / MultiSourceLoader
+        self._snapshot: Optional[Snapshot] = None
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def start(self) -> 'SnapshotRefresher':
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='snapshot-refresher', daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def current(self, timeout: Optional[float] = None) -> Optional[Snapshot]:
+        """Snapshot ล่าสุด; ครั้งแรกจะรอจนการโหลดรอบแรกเสร็จ (สูงสุด timeout วินาที)"""
+        self._ready.wait(timeout)
+        return self._snapshot
+
+    def loader_stats(self) -> Dict[str, Dict[str, int]]:
+        """จำนวนครั้งที่โหลดทั้งหมด/เพิ่มทีละส่วน/ข้าม (ไฟล์ไม่เปลี่ยน) ต่อแหล่งข้อมูล"""
+        return {source: loader.stats() for source, loader in list(self._loaders.items())}
+
+    def _run(self) -> None:
+        self._seed_from_snapshot()
+        while True:
+            self.refresh_once()
+            if self._stop.wait(self.interval):
+                return
+
+    def _seed_from_snapshot(self) -> None:
+        if self.snapshot_path is None:
+            return
+        try:
+            stored = load_snapshot(self.snapshot_path)
+            if (stored is None or stored[1].get('source') != self.source
+                    or stored[1].get('version') != PREPARE_VERSION):
+                return
+            frame, meta = stored
+            frame = add_comment_flags(frame)  # snapshot ที่เขียนก่อนมีคอลัมน์ flag
+            loader = make_loader(self.sources, self.source_cache_dir)
+            loader.restore(frame, meta.get('loader', {}))
+            self._loaders[self.source] = loader
+            timer = StageTimer('refresh')
+            timer.info.update(source=self.source, load='snapshot', rows=len(frame))
+            with timer.stage('aggregate'):
+                cube = build_cube(frame)
+            with timer.stage('index'):
+                index = CommentIndex.build(frame)
+            with timer.stage('trend'):
+                trends = {freq: build_trend(frame, freq) for freq in TREND_FREQS}
+            self._snapshot = Snapshot(frame, cube, self.source, False, meta.get('saved_at', 0.0),
+                                      comments=index, trends=trends)
+            self._ready.set()
+            TIMINGS.add(timer)
+        except Exception as e:
+            self.last_error = str(e)
+
+    def _save(self, snap: Snapshot, timer: StageTimer) -> None:
+        if self.snapshot_path is None:
+            return
+        try:
+            meta = {'source': snap.source, 'version': PREPARE_VERSION, 'saved_at': snap.loaded_at,
+                    'loader': self._loaders[snap.source].state()}
+            with timer.stage('snapshot_save'):
+                save_snapshot(snap.frame, meta, self.snapshot_path)
+        except Exception as e:
+            # เขียน snapshot ไม่ได้ไม่กระทบการแสดงผล
+            self.last_error = str(e)
+
+    def _load(self, source: SourceSpec, timer: StageTimer) -> pd.DataFrame:
+        label = source_label(source)
+        if label not in self._loaders:
+            self._loaders[label] = make_loader(source, self.source_cache_dir)
+        loader = self._loaders[label]
+        timer.info['source'] = label
+        frame = loader.poll(timer)
+        if frame.empty:
+            raise ValueError("Empty Data")
+        return frame
+
+    def _build(self, frame: pd.DataFrame, source: str, is_fallback: bool, timer: StageTimer,
+               error: Optional[str] = None, source_errors: Optional[Dict[str, str]] = None) -> Snapshot:
+        prev = self._snapshot
+        # ไม่มีแถวใหม่ → loader คืน frame เดิม จึงใช้ Snapshot เดิมต่อทั้งหมด (cube, ดัชนี, trend
+        # และผลคำนวณที่ memoize ไว้แล้ว) เปลี่ยนเฉพาะเวลาโหลดและสถานะ
+        if prev is not None and prev.frame is frame:
+            timer.info['rows'] = len(frame)
+            return replace(prev, source=source, is_fallback=is_fallback, loaded_at=time.time(), error=error,
+                           source_errors=source_errors or {})
+        with timer.stage('aggregate'):
+            cube = build_cube(frame)
+        start = self._loaders[source].appended_from
+        # แถวใหม่ต่อท้าย frame ของ Snapshot ก่อนหน้า: ทำดัชนี/trend เฉพาะแถวใหม่
+        appended = prev is not None and prev.source == source and start == len(prev.frame)
+        with timer.stage('index'):
+            index = prev.comments.extended(frame, start) if appended else CommentIndex.build(frame)
+        with timer.stage('trend'):
+            if appended:
+                new_rows = frame.iloc[start:]
+                trends = {freq: merge_trend(prev.trends.get(freq, pd.DataFrame()), build_trend(new_rows, freq))
+                          for freq in TREND_FREQS}
+            else:
+                trends = {freq: build_trend(frame, freq) for freq in TREND_FREQS}
+        timer.info['rows'] = len(frame)
+        return Snapshot(frame, cube, source, is_fallback, time.time(), error, source_errors or {},
+                        comments=index, trends=trends)
+
+    def refresh_once(self) -> Optional[Snapshot]:
+        """เตรียม Snapshot ถัดไปแล้วสลับเข้าแทนชุดเดิม (คืน Snapshot ที่ใช้อยู่หลังรอบนี้)"""
+        timer = StageTimer('refresh')
+        try:
+            try:
+                prev = self._snapshot
+                frame = self._load(self.sources, timer)
+                # บางแหล่งโหลดไม่สำเร็จ: ยังแสดงข้อมูลรวม แต่แจ้งแหล่งที่ใช้ข้อมูลชุดก่อนหน้า
+                source_errors = dict(self._loaders[self.source].errors)
+                self.last_error = '; '.join(f'{s}: {e}' for s, e in source_errors.items()) or None
+                snap = self._build(frame, self.source, False, timer, self.last_error, source_errors)
+                if prev is None or prev.frame is not snap.frame:
+                    self._save(snap, timer)
+            except Exception as e:
+                self.last_error = str(e)
+                prev = self._snapshot
+                if prev is not None and not prev.is_fallback:
+                    snap = replace(prev, error=self.last_error, source_errors={})
+                elif self.fallback is not None:
+                    snap = self._build(self._load(self.fallback, timer), self.fallback, True, timer,
+                                       self.last_error)
+                else:
+                    snap = prev
+            self._snapshot = snap
+        except Exception as e:
+            # ไฟล์สำรองก็อ่านไม่ได้: คง Snapshot เดิมไว้ (ถ้ามี)
+            self.last_error = str(e)
+        finally:
+            self._ready.set()
+            if self.last_error:
+                timer.info['error'] = self.last_error
+            TIMINGS.add(timer)
+        return self._snapshot
@@ -0,0 +1,311 @@
+# ==============================================================================
+# STATIC REPORT EXPORT (batch)
+# ==============================================================================
+# วิธีใช้: python report.py [--source ไฟล์/URL ...] [--period month|quarter|year|all] [--latest]
+#                          [--format html xlsx] [--out reports] [--workers N]
+# สร้างรายงานของทุกหน่วยงาน (และภาพรวมทั้งหมด) ทุกช่วงเวลาในครั้งเดียว ด้วยตัวเลขชุดเดียวกับหน้า Dashboard
+# (compute_dashboard, gauge ชุดเดียวกันจาก charts, ตารางความคิดเห็นเต็มจาก CommentRows.table)
+# ได้เป็นไฟล์ HTML/XLSX ที่เปิด/วางบน web server ธรรมดาได้โดยไม่ต้องรัน Streamlit
+# โหลดข้อมูลและสร้าง cube ครั้งเดียว แล้วแบ่งงานทีละหน่วยงานให้ process pool (ข้อมูลส่งให้แต่ละ worker ครั้งเดียว)
+# ไม่มี PDF: การแปลงกราฟ Plotly เป็นภาพนิ่งต้องใช้ kaleido/เบราว์เซอร์ (พิมพ์ HTML เป็น PDF จากเบราว์เซอร์แทน)
+import argparse
+import html
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from plotly.offline import get_plotlyjs
+
+from aggregates import ROWS_COL, build_cube, level_values
+from charts import gauge_grid_figure, intention_gauges, rating_figure, score_gauges
+from comments import add_comment_flags
+from compute import DashboardResult, FilterSpec, compute_dashboard
+from ingest import make_loader, parse_sources
+from scoring import OVERALL_COL, SATISFACTION_COLS
+from snapshots import SNAPSHOT_PATH, SOURCE_CACHE_DIR, load_snapshot
+
+DATA_FILE = 'mpxi.xlsx'
+OVERALL = 'ภาพรวมทั้งหมด'
+PERIODS = {'month': ['ปี', 'เดือน'], 'quarter': ['ปี', 'ไตรมาส'], 'year': ['ปี'], 'all': []}
+THAI_MONTHS = {1: 'ม.ค.', 2: 'ก.พ.', 3: 'มี.ค.', 4: 'เม.ย.', 5: 'พ.ค.', 6: 'มิ.ย.', 7: 'ก.ค.', 8: 'ส.ค.',
+               9: 'ก.ย.', 10: 'ต.ค.', 11: 'พ.ย.', 12: 'ธ.ค.'}
+PLOTLY_JS = 'plotly.min.js'
+
+# (ชื่อโฟลเดอร์, ชื่อที่แสดง, ตัวกรองช่วงเวลาของ FilterSpec)
+Period = Tuple[str, str, Dict[str, int]]
+
+
+def load_frame(sources: Optional[List[str]], snapshot_path: Optional[str]) -> Tuple[pd.DataFrame, str]:
+    """ข้อมูลที่เตรียมแล้ว: จาก sources (ผ่าน loader เดียวกับ Dashboard) หรือ snapshot ไบนารีของ Dashboard"""
+    if not sources and snapshot_path:
+        stored = load_snapshot(snapshot_path)
+        if stored is not None:
+            return add_comment_flags(stored[0]), f"snapshot {snapshot_path} ({stored[1].get('source', '')})"
+    sources = sources or [DATA_FILE]
+    loader = make_loader(sources if len(sources) > 1 else sources[0], SOURCE_CACHE_DIR)
+    return loader.poll(), ' + '.join(sources)
+
+
+def report_periods(cube: pd.DataFrame, period: str, latest: bool = False) -> List[Period]:
+    """ช่วงเวลาที่มีข้อมูลของระดับ period เรียงจากเก่าไปใหม่ (latest = เฉพาะช่วงล่าสุด)"""
+    keys = PERIODS[period]
+    if not keys:
+        return [('all', 'ทุกช่วงเวลา', {})]
+    cells = cube[cube[ROWS_COL] > 0].index.to_frame(index=False)
+    if any(k not in cells.columns for k in keys):
+        return []
+    values = cells[keys].dropna().drop_duplicates().astype(int).sort_values(keys).itertuples(index=False)
+    periods = []
+    for row in values:
+        year = row[0]
+        if period == 'year':
+            periods.append((f'{year}', f'ปี {year}', {'year': year}))
+        elif period == 'quarter':
+            periods.append((f'{year}-Q{row[1]}', f'ไตรมาส {row[1]}/{year}', {'year': year, 'quarter': row[1]}))
+        else:
+            periods.append((f'{year}-{row[1]:02d}', f'{THAI_MONTHS[row[1]]} {year}', {'year': year, 'month': row[1]}))
+    return periods[-1:] if latest else periods
+
+
+def report_rows(frame: pd.DataFrame, period: str) -> Dict[Tuple[Optional[str], Tuple[int, ...]], np.ndarray]:
+    """ตำแหน่งแถวของทุก (หน่วยงาน, ช่วงเวลา) จาก groupby ครั้งเดียวต่อระดับ (หน่วยงาน None = ภาพรวมทั้งหมด)
+
+    key ของช่วงเวลาเรียงตาม PERIODS[period] เช่น (ปี, เดือน) รายงานแต่ละฉบับจึงไม่ต้องสแกนข้อมูลทั้งชุด
+    ด้วย filter_rows ซ้ำทุก (หน่วยงาน × ช่วงเวลา)
+    """
+    keys = PERIODS[period]
+    rows: Dict[Tuple[Optional[str], Tuple[int, ...]], np.ndarray] = {}
+    if 'หน่วยงาน' in frame.columns:
+        for key, pos in _group_positions(frame, ['หน่วยงาน'] + keys):
+            rows[(key[0], tuple(int(v) for v in key[1:]))] = pos
+    if keys:
+        for key, pos in _group_positions(frame, keys):
+            rows[(None, tuple(int(v) for v in key))] = pos
+    else:
+        rows[(None, ())] = np.arange(len(frame))
+    return rows
+
+
+def _group_positions(frame: pd.DataFrame, by: List[str]):
+    # groupby(...).indices ให้ key เป็นค่าเดียวเมื่อจัดกลุ่มด้วยคอลัมน์เดียว: ทำให้เป็น tuple เสมอ
+    for key, pos in frame.groupby(by, observed=True, sort=False).indices.items():
+        yield (key if isinstance(key, tuple) else (key,)), pos
+
+
+def safe_name(name: str) -> str:
+    # ชื่อหน่วยงานเป็นชื่อไฟล์ (คงภาษาไทยไว้ ตัดเฉพาะอักขระที่ใช้ในชื่อไฟล์ไม่ได้)
+    return re.sub(r'[\\/:*?"<>|\s]+', '_', name).strip('_') or 'unnamed'
+
+
+# ==============================================================================
+# CONTENT (ตารางเดียวกันทั้ง HTML และ XLSX)
+# ==============================================================================
+def format_avg(avg: float) -> str:
+    # ช่วงที่ไม่มีคะแนนเลย (avg เป็น NaN) แสดง N/A แทน 'nan'
+    return f'{avg:.2f}' if pd.notna(avg) else 'N/A'
+
+
+def summary_table(result: DashboardResult) -> pd.DataFrame:
+    rows = [('จำนวนผู้ตอบ', f'{result.total_responses:,}'),
+            ('คะแนนพึงพอใจเฉลี่ย', format_avg(result.avg_satisfaction)),
+            ('สุขภาพผู้ป่วยโดยรวม', result.health_mode or 'N/A')]
+    rows += [(label, f'{g.value:.1f}%') for g, label in
+             zip(intention_gauges(result.intentions), ['% กลับมาใช้บริการ', '% การบอกต่อ', '% ไม่พึงพอใจ'])]
+    return pd.DataFrame(rows, columns=['ตัวชี้วัด', 'ค่า'])
+
+
+def question_table(result: DashboardResult) -> pd.DataFrame:
+    titles = {**SATISFACTION_COLS, OVERALL_COL: 'ความพึงพอใจโดยรวม'}
+    return pd.DataFrame([(titles[col], round(avg, 2) if pd.notna(avg) else None, n)
+                         for col, (avg, n) in result.question_scores.items()],
+                        columns=['หัวข้อ', 'คะแนนเฉลี่ย', 'n'])
+
+
+def intention_table(result: DashboardResult) -> pd.DataFrame:
+    return pd.DataFrame([(g.title, round(g.value, 1), g.n) for g in intention_gauges(result.intentions)],
+                        columns=['หัวข้อ', '%', 'n'])
+
+
+def comment_tables(frame: pd.DataFrame, result: DashboardResult) -> Dict[str, pd.DataFrame]:
+    tables = {}
+    for title, comments in (('รายละเอียดความไม่พึงพอใจ', result.complaints), ('ความคาดหวังต่อบริการ', result.suggestions)):
+        if comments is not None:
+            tables[title] = comments.table(frame).reset_index(drop=True)
+    return tables
+
+
+# ==============================================================================
+# WRITERS
+# ==============================================================================
+PAGE_CSS = """body{font-family:sans-serif;margin:24px auto;max-width:1200px;color:#111}
+.tiles{display:grid;grid-template-columns:repeat(3,1fr);gap:12px;margin:16px 0}
+.tile{border:1px solid #e5e7eb;border-radius:12px;padding:14px;background:#f9fafb}
+.tile .label{color:#6b7280;font-size:.9rem}.tile .value{font-size:1.8rem;font-weight:700}
+table{border-collapse:collapse;width:100%;font-size:.9rem}th,td{border:1px solid #e5e7eb;padding:4px 8px;text-align:left}
+th{background:#f3f4f6}.meta{color:#6b7280;font-size:.85rem}"""
+
+
+def _figure_html(fig) -> str:
+    return fig.to_html(full_html=False, include_plotlyjs=False, config={'displayModeBar': False})
+
+
+def _page(title: str, body: str, plotly_src: Optional[str] = None) -> str:
+    script = f'<script src="{plotly_src}"></script>' if plotly_src else ''
+    return (f'<!doctype html><html lang="th"><head><meta charset="utf-8"><title>{html.escape(title)}</title>'
+            f'{script}<style>{PAGE_CSS}</style></head><body>{body}</body></html>')
+
+
+def write_html(path: str, frame: pd.DataFrame, result: DashboardResult, department: str, period_title: str,
+               generated: str) -> None:
+    tiles = ''.join(f'<div class="tile"><div class="label">{html.escape(k)}</div>'
+                    f'<div class="value">{html.escape(v)}</div></div>'
+                    for k, v in summary_table(result).itertuples(index=False))
+    parts = [f'<h1>{html.escape(department)}</h1>',
+             f'<p class="meta">ช่วงเวลา: {html.escape(period_title)} · สร้างเมื่อ {generated}</p>',
+             f'<div class="tiles">{tiles}</div>']
+    if result.responses_by_department is not None:
+        parts += ['<h2>สรุปจำนวนการประเมินตามหน่วยงาน</h2>', result.responses_by_department.to_html(index=False)]
+    parts += ['<h2>ความพึงพอใจโดยรวม</h2>',
+              _figure_html(rating_figure(result.overall_histogram, "Distribution ของคะแนน (1–5)")),
+              '<h2>ส่วนที่ 2: ความพึงพอใจต่อบริการ (รายหัวข้อ)</h2>',
+              _figure_html(gauge_grid_figure(score_gauges(result.question_scores), columns=2)),
+              '<h2>ส่วนที่ 3: ความตั้งใจในอนาคตและข้อเสนอแนะ</h2>',
+              _figure_html(gauge_grid_figure(intention_gauges(result.intentions), columns=3))]
+    for title, table in comment_tables(frame, result).items():
+        parts += [f'<h3>{html.escape(title)} ({len(table):,} รายการ)</h3>',
+                  table.to_html(index=False, na_rep='') if len(table) else '<p class="meta">ไม่มีข้อมูล</p>']
+    # รายงานอยู่ใน <out>/<ช่วงเวลา>/ และใช้ plotly.js ไฟล์เดียวที่ <out>/ (เปิดได้แม้ไม่มีอินเทอร์เน็ต)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(_page(f'{department} — {period_title}', ''.join(parts), f'../{PLOTLY_JS}'))
+
+
+def write_xlsx(path: str, frame: pd.DataFrame, result: DashboardResult) -> None:
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        summary_table(result).to_excel(writer, sheet_name='สรุป', index=False)
+        question_table(result).to_excel(writer, sheet_name='รายหัวข้อ', index=False)
+        intention_table(result).to_excel(writer, sheet_name='ความตั้งใจ', index=False)
+        if result.responses_by_department is not None:
+            result.responses_by_department.to_excel(writer, sheet_name='จำนวนตามหน่วยงาน', index=False)
+        for title, table in comment_tables(frame, result).items():
+            # ข้อความแบบ Arrow → object ก่อนเขียนลง openpyxl
+            table.astype(object).to_excel(writer, sheet_name=title[:31], index=False)
+
+
+# ==============================================================================
+# BATCH (process pool)
+# ==============================================================================
+_FRAME: Optional[pd.DataFrame] = None
+_CUBE: Optional[pd.DataFrame] = None
+
+
+def _init_worker(frame: pd.DataFrame, cube: pd.DataFrame) -> None:
+    global _FRAME, _CUBE
+    _FRAME, _CUBE = frame, cube
+
+
+def render_department(department: Optional[str], periods: List[Period], out_dir: str, formats: List[str],
+                      generated: str, rows: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """รายงานของหน่วยงานหนึ่ง (None = ภาพรวมทั้งหมด) ทุกช่วงเวลาใน periods (ข้ามช่วงที่ไม่มีผู้ตอบ)
+
+    rows: ชื่อโฟลเดอร์ของช่วงเวลา -> ตำแหน่งแถวของหน่วยงานนี้ในช่วงนั้น (จาก report_rows)
+    """
+    name = department or OVERALL
+    entries = []
+    for label, title, period in periods:
+        result = compute_dashboard(_FRAME, _CUBE, FilterSpec(department=department, **period), rows[label])
+        if result.empty:
+            continue
+        base = os.path.join(out_dir, label, safe_name(name))
+        files = []
+        if 'html' in formats:
+            write_html(base + '.html', _FRAME, result, name, title, generated)
+            files.append(base + '.html')
+        if 'xlsx' in formats:
+            write_xlsx(base + '.xlsx', _FRAME, result)
+            files.append(base + '.xlsx')
+        entries.append({'department': name, 'period': label, 'title': title,
+                        'responses': result.total_responses, 'avg': result.avg_satisfaction,
+                        'files': [os.path.relpath(f, out_dir) for f in files]})
+    return entries
+
+
+def write_index(out_dir: str, entries: List[Dict[str, Any]], source: str, generated: str) -> str:
+    rows = ''.join(
+        f"<tr><td>{html.escape(e['title'])}</td><td>{html.escape(e['department'])}</td>"
+        f"<td>{e['responses']:,}</td><td>{format_avg(e['avg'])}</td><td>"
+        + ' · '.join(f'<a href="{html.escape(f)}">{os.path.splitext(f)[1][1:].upper()}</a>' for f in e['files'])
+        + '</td></tr>'
+        for e in sorted(entries, key=lambda e: (e['period'], e['department'] != OVERALL, e['department'])))
+    body = (f'<h1>รายงานประสบการณ์ผู้ป่วย [IPD]</h1><p class="meta">ข้อมูล: {html.escape(source)} · '
+            f'สร้างเมื่อ {generated} · {len(entries):,} รายงาน</p>'
+            f'<table><tr><th>ช่วงเวลา</th><th>หน่วยงาน</th><th>ผู้ตอบ</th><th>คะแนนเฉลี่ย</th><th>ไฟล์</th></tr>'
+            f'{rows}</table>')
+    path = os.path.join(out_dir, 'index.html')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(_page('รายงานประสบการณ์ผู้ป่วย [IPD]', body))
+    return path
+
+
+def export_reports(frame: pd.DataFrame, out_dir: str, period: str = 'month', latest: bool = False,
+                   formats: Optional[List[str]] = None, workers: Optional[int] = None,
+                   source: str = '') -> List[Dict[str, Any]]:
+    """รายงานของภาพรวมและทุกหน่วยงาน × ทุกช่วงเวลา (workers = 1: ทำใน process นี้)"""
+    formats = formats or ['html', 'xlsx']
+    generated = datetime.now().strftime('%d/%m/%Y %H:%M')
+    cube = build_cube(frame)
+    periods = report_periods(cube, period, latest)
+    for label, _, _ in periods:
+        os.makedirs(os.path.join(out_dir, label), exist_ok=True)
+    if 'html' in formats:
+        with open(os.path.join(out_dir, PLOTLY_JS), 'w', encoding='utf-8') as f:
+            f.write(get_plotlyjs())
+
+    departments = [None] + sorted(level_values(cube, 'หน่วยงาน'))
+    # ตำแหน่งแถวของทุกรายงานจาก groupby ครั้งเดียว แต่ละ worker ได้เฉพาะของหน่วยงานตัวเอง
+    # (ค่าใน filter ของ Period เรียงตาม PERIODS[period] เหมือน key ของ report_rows)
+    positions = report_rows(frame, period)
+    no_rows = np.empty(0, dtype=np.intp)
+    args = [(d, periods, out_dir, formats, generated,
+             {label: positions.get((d, tuple(f.values())), no_rows) for label, _, f in periods})
+            for d in departments]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(frame, cube)
+        results = [render_department(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(departments)), initializer=_init_worker,
+                                 initargs=(frame, cube)) as pool:
+            results = list(pool.map(render_department, *zip(*args)))
+    entries = [e for r in results for e in r]
+    write_index(out_dir, entries, source, generated)
+    return entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ส่งออกรายงาน HTML/XLSX ของทุกหน่วยงานและทุกช่วงเวลา')
+    parser.add_argument('--source', nargs='+',
+                        help='ไฟล์ xlsx/CSV หรือ URL (หลายแหล่งได้; ค่าเริ่มต้น MPX_SOURCES, snapshot หรือ mpxi.xlsx)')
+    parser.add_argument('--snapshot', default=SNAPSHOT_PATH, help='snapshot ของ Dashboard (ใช้เมื่อไม่ระบุ --source)')
+    parser.add_argument('--period', choices=list(PERIODS), default='month')
+    parser.add_argument('--latest', action='store_true', help='เฉพาะช่วงเวลาล่าสุด')
+    parser.add_argument('--format', nargs='+', choices=['html', 'xlsx'], default=['html', 'xlsx'])
+    parser.add_argument('--out', default='reports')
+    parser.add_argument('--workers', type=int, help='จำนวน process (ค่าเริ่มต้น = จำนวน CPU)')
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    sources = args.source or parse_sources(os.environ.get('MPX_SOURCES', ''))
+    frame, source = load_frame(sources, args.snapshot)
+    t_load = time.perf_counter() - t0
+    entries = export_reports(frame, args.out, args.period, args.latest, args.format, args.workers, source)
+    print(f"{len(entries):,} รายงาน ({len(frame):,} แถว จาก {source}) → {args.out}/index.html"
+          f" · โหลด {t_load:.1f} วินาที · สร้างรายงาน {time.perf_counter() - t0 - t_load:.1f} วินาที")
+
+
+if __name__ == '__main__':
+    main()
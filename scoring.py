@@ -0,0 +1,161 @@
+# ==============================================================================
+# LIKERT SCORING ENGINE
+# ==============================================================================
+# แปลงคำตอบ Likert (ข้อความ/ตัวเลข) เป็นคะแนน 1-5
+# - normalize_to_1_5: ฟังก์ชันต้นฉบับ (ทีละเซลล์) ใช้เป็นนิยามของคะแนน
+# - score_likert_columns: แปลงทุกคอลัมน์ในครั้งเดียว โดยแยกคำตอบที่ไม่ซ้ำกันออกมาเป็น
+#   ตารางรหัส (code table) แล้วเรียก normalize_to_1_5 เพียงครั้งเดียวต่อคำตอบ
+import re
+from typing import Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+LIKERT_MAP = {'มากที่สุด': 5, 'มาก': 4, 'ปานกลาง': 3, 'น้อย': 2, 'น้อยมาก': 1,
+              ' มากที่สุด': 5, ' มาก': 4, ' ปานกลาง': 3, ' น้อย': 2, ' น้อยมาก': 1}
+
+SATISFACTION_COLS = {
+    'Q1_ความสะดวกการรับบริการ': '1. ความสะดวกในการติดต่อและเข้ารับบริการ',
+    'Q2_การรับฟัง': '2. การรับฟังและเปิดโอกาสให้ซักถาม',
+    'Q3_ความชัดเจนข้อมูลบริการ': '3. ความชัดเจนของข้อมูลขั้นตอนบริการ',
+    'Q4_ความเท่าเทียม': '4. การดูแลอย่างเท่าเทียมและให้เกียรติ',
+    'Q5_ความสะอาดและสิ่งอำนวยความสะดวก': '5. ความสะอาดและสิ่งอำนวยความสะดวก',
+    'Q6_การตอบสนอง': '6. การตอบสนองเมื่อต้องการความช่วยเหลือ',
+    'Q7_ข้อมูลค่าใช้จ่าย': '7. ความชัดเจนของข้อมูลค่าใช้จ่าย',
+    'Q8_ข้อมูลการรักษา': '8. การได้รับข้อมูลการรักษาและอาการแทรกซ้อน',
+    'Q9_การมีส่วนร่วมวางแผน': '9. การมีส่วนร่วมในการวางแผนการรักษา',
+    'Q10_ข้อมูลด้านยา': '10. ความชัดเจนของข้อมูลด้านยา'
+}
+OVERALL_COL = 'ความพึงพอใจโดยรวม'
+LIKERT_COLUMNS = list(SATISFACTION_COLS.keys()) + [OVERALL_COL]
+
+# แบบฟอร์มปีก่อน ๆ (ไฟล์ export mpxi*.xlsx) ตอบข้อ 1, 3, 5, 7-10 ด้วยคำเฉพาะของแต่ละข้อแทน มากที่สุด-น้อยมาก
+# normalize_to_1_5 ให้คะแนนคำเหล่านี้ผิด ('สะดวกมาก'/'ยุ่งยากมาก' มี 'มาก' → 4, 'สะดวก' ไม่ได้คะแนน)
+# จึงแปลงเป็นระดับ Likert ที่มีคะแนนเท่ากันก่อน (historical_answers_to_likert)
+_CONVENIENCE_SCORES = {'สะดวกมาก': 5, 'สะดวก': 4, 'ปานกลาง': 3, 'ยุ่งยาก': 2, 'ยุ่งยากมาก': 1}
+_CLARITY_SCORES = {'ชัดเจนมาก': 5, 'ชัดเจนดี': 4, 'ชัดเจนพอควร': 4, 'ปานกลาง': 3, 'ชัดเจนบ้าง': 2,
+                   'ไม่ชัดเจนเลย': 1}
+_SUITABILITY_SCORES = {'เหมาะสมมาก': 5, 'เหมาะสม': 4, 'ปานกลาง': 3, 'ไม่ค่อยเหมาะสม': 2, 'ไม่เหมาะสม': 1}
+HISTORICAL_ANSWER_SCORES: Dict[str, Dict[str, int]] = {
+    'Q1_ความสะดวกการรับบริการ': _CONVENIENCE_SCORES,
+    'Q3_ความชัดเจนข้อมูลบริการ': _CLARITY_SCORES,
+    'Q5_ความสะอาดและสิ่งอำนวยความสะดวก': _SUITABILITY_SCORES,
+    'Q7_ข้อมูลค่าใช้จ่าย': _CLARITY_SCORES,
+    'Q8_ข้อมูลการรักษา': _CLARITY_SCORES,
+    'Q9_การมีส่วนร่วมวางแผน': _SUITABILITY_SCORES,
+    'Q10_ข้อมูลด้านยา': _CLARITY_SCORES,
+}
+LIKERT_LABELS = {5: 'มากที่สุด', 4: 'มาก', 3: 'ปานกลาง', 2: 'น้อย', 1: 'น้อยมาก'}
+
+# ชนิดข้อมูลที่ค่าเท่ากัน (==) ก็ต่อเมื่อ str() เท่ากัน จึง factorize ค่าดิบได้โดยตรง
+_HOMOGENEOUS_KINDS = ('string', 'integer', 'floating', 'empty')
+
+
+def normalize_to_1_5(x):
+    if pd.isna(x): return pd.NA
+    s = str(x).strip()
+    if s in LIKERT_MAP: return LIKERT_MAP[s]
+    m = re.search(r'([1-5])', s)
+    if m: return int(m.group(1))
+    for k, v in LIKERT_MAP.items():
+        if k.strip() in s: return v
+    return pd.NA
+
+
+def historical_answers_to_likert(series: pd.Series, col: str) -> pd.Series:
+    """แทนคำตอบแบบฟอร์มเก่าของข้อ col ด้วยระดับ Likert ที่มีคะแนนเท่ากัน (คำตอบอื่นคงเดิม)"""
+    scores = HISTORICAL_ANSWER_SCORES.get(col)
+    if not scores:
+        return series
+    labels = {answer: LIKERT_LABELS[score] for answer, score in scores.items()}
+    return series.map(lambda x: labels.get(str(x).strip(), x) if not pd.isna(x) else x)
+
+
+def score_column_name(col: str) -> str:
+    return f'{col}__score'
+
+
+def _code_table(uniques: np.ndarray) -> np.ndarray:
+    # ตารางรหัส: 0 = ไม่มีคะแนน, ช่องสุดท้ายรองรับ code -1 (ค่าว่าง)
+    table = np.zeros(len(uniques) + 1, dtype=np.int8)
+    for i, u in enumerate(uniques):
+        v = normalize_to_1_5(u)
+        if not pd.isna(v): table[i] = v
+    return table
+
+
+def score_likert_columns(df: pd.DataFrame, columns: Iterable[str] = LIKERT_COLUMNS) -> pd.DataFrame:
+    """คืน DataFrame คะแนน (Int8, <NA> = ไม่มีคะแนน) ของทุกคอลัมน์ที่มีอยู่ใน df
+
+    คำตอบทุกเซลล์ถูก factorize รวมกัน (แยกตามชนิดข้อมูล) จากนั้น normalize_to_1_5 ถูกเรียกกับ
+    คำตอบที่ไม่ซ้ำกันเท่านั้น ผลลัพธ์จึงเท่ากับ .apply(normalize_to_1_5) ทุกประการ
+    """
+    cols: List[str] = [c for c in columns if c in df.columns]
+    if not cols:
+        return pd.DataFrame(index=df.index)
+
+    # factorize ใช้การเท่ากันของค่า (1 == 1.0 == True) ซึ่ง str() ไม่เท่ากัน จึงรวมเฉพาะคอลัมน์
+    # ชนิดเดียวกันเข้าด้วยกัน ส่วนคอลัมน์ชนิดผสมใช้ str(x) เป็นกุญแจ (ตรงกับที่ normalize_to_1_5 ใช้)
+    groups: Dict[str, List[str]] = {}
+    for c in cols:
+        kind = pd.api.types.infer_dtype(df[c], skipna=True)
+        groups.setdefault(kind if kind in _HOMOGENEOUS_KINDS else 'mixed', []).append(c)
+
+    scores = np.empty((len(df), len(cols)), dtype=np.int8, order='F')
+    pos = {c: j for j, c in enumerate(cols)}
+    for kind, group in groups.items():
+        flat = df[group].to_numpy(dtype=object).ravel(order='F')
+        if kind == 'mixed':
+            flat = pd.Series(flat, dtype=object).astype(str).to_numpy()
+        codes, uniques = pd.factorize(flat, use_na_sentinel=True)
+        block = _code_table(uniques)[codes].reshape((len(df), len(group)), order='F')
+        for k, c in enumerate(group):
+            scores[:, pos[c]] = block[:, k]
+
+    missing = np.asfortranarray(scores == 0)
+    return pd.DataFrame(
+        {score_column_name(c): pd.arrays.IntegerArray(scores[:, j], missing[:, j])
+         for j, c in enumerate(cols)},
+        index=df.index,
+    )
+
+
+# ==============================================================================
+# PRECOMPUTED SCORE COLUMNS
+# ==============================================================================
+SATISFACTION_SCORE_MAP = {'มากที่สุด': 5, 'มาก': 4, 'ปานกลาง': 3, 'น้อย': 2, 'น้อยมาก': 1}
+SATISFACTION_SCORE_COL = 'คะแนนความพึงพอใจ'
+
+# คำถามใช่/ไม่ใช่ และคำตอบที่นับเป็น "บวก" ของแต่ละข้อ
+INTENTION_COLS = {
+    'กลับมารับบริการหรือไม่': ('ใช่',),
+    'แนะนำผู้อื่นหรือไม่': ('ใช่',),
+    'มีความไม่พึงพอใจหรือไม่': ('มี',),
+}
+
+
+def flag_column_name(col: str) -> str:
+    return f'{col}__flag'
+
+
+def positive_flags(series: pd.Series, positives=("ใช่",)) -> pd.Series:
+    """True/False ตามคำตอบ (ตัดช่องว่าง) ว่าอยู่ใน positives หรือไม่, <NA> เมื่อไม่มีคำตอบ"""
+    codes, uniques = pd.factorize(series.to_numpy(dtype=object), use_na_sentinel=True)
+    table = np.array([str(u).strip() in positives for u in uniques] + [False], dtype=bool)
+    return pd.Series(pd.arrays.BooleanArray(table[codes], codes == -1), index=series.index)
+
+
+def add_score_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """เพิ่มคอลัมน์คะแนนที่ใช้ใน Dashboard ทั้งหมด (ทำครั้งเดียวตอนโหลดข้อมูล)
+
+    - '<คอลัมน์>__score' (Int8) ของ Q1-Q10 และความพึงพอใจโดยรวม
+    - 'คะแนนความพึงพอใจ' (Int8) ตาม SATISFACTION_SCORE_MAP
+    - '<คอลัมน์>__flag' (boolean) ของคำถามความตั้งใจในอนาคต
+    """
+    extra = {}
+    if OVERALL_COL in df.columns:
+        extra[SATISFACTION_SCORE_COL] = df[OVERALL_COL].map(SATISFACTION_SCORE_MAP).astype('Int8')
+    for col, positives in INTENTION_COLS.items():
+        if col in df.columns:
+            extra[flag_column_name(col)] = positive_flags(df[col], positives)
+    return pd.concat([df, score_likert_columns(df), pd.DataFrame(extra, index=df.index)], axis=1)
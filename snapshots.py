@@ -0,0 +1,74 @@
+# ==============================================================================
+# BINARY SNAPSHOT CACHE (Arrow IPC / Feather v2)
+# ==============================================================================
+# หลังโหลดจาก Google Sheets สำเร็จ ข้อมูลที่เตรียมแล้ว (ชื่อคอลัมน์ใหม่, date_col, คอลัมน์คะแนน)
+# จะถูกเขียนเป็นไฟล์ Feather แบบไม่บีบอัด ตอน cold start หรือเมื่อดึงชีตไม่ได้ จะ memory-map
+# ไฟล์นี้แทนการอ่าน mpxi.xlsx ผ่าน openpyxl (xlsx ใช้เมื่อไม่มี snapshot เท่านั้น)
+import json
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # ไม่มี pyarrow: ข้ามการใช้ snapshot ทั้งหมด
+    pa = None
+
+SNAPSHOT_PATH = os.environ.get('MPX_SNAPSHOT_PATH', os.path.join('.cache', 'snapshot.feather'))
+# ข้อมูลที่เตรียมแล้วต่อแหล่ง เมื่อรวมหลายแหล่ง (ingest.MultiSourceLoader)
+SOURCE_CACHE_DIR = os.environ.get('MPX_SOURCE_CACHE_DIR', os.path.join('.cache', 'sources'))
+_META_KEY = b'mpx_snapshot'
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def _arrow_safe(frame: pd.DataFrame) -> pd.DataFrame:
+    # คอลัมน์ที่มีหลายชนิดปนกัน (เช่น วันนอน = 3 / '4 คืน') เก็บใน Arrow ไม่ได้ จึงเก็บเป็นข้อความ
+    fixed = {}
+    for col in frame.columns:
+        s = frame[col]
+        is_category = isinstance(s.dtype, pd.CategoricalDtype)
+        values = s.cat.categories if is_category else s
+        if values.dtype != object:
+            continue
+        try:
+            pa.array(values, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            text = s.astype(object).astype(str).where(s.notna())
+            fixed[col] = text.astype('category') if is_category else text
+    return frame.assign(**fixed) if fixed else frame
+
+
+def save_snapshot(frame: pd.DataFrame, meta: Optional[Dict[str, Any]] = None,
+                  path: str = SNAPSHOT_PATH) -> bool:
+    """เขียน snapshot (ไฟล์ชั่วคราวแล้ว os.replace ผู้อ่านจึงไม่เห็นไฟล์ที่เขียนไม่ครบ)"""
+    if pa is None:
+        return False
+    table = pa.Table.from_pandas(_arrow_safe(frame), preserve_index=True)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_META_KEY] = json.dumps(meta or {}, ensure_ascii=False).encode('utf-8')
+    table = table.replace_schema_metadata(metadata)
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f'{path}.tmp'
+    feather.write_feather(table, tmp, compression='uncompressed')
+    os.replace(tmp, path)
+    return True
+
+
+def load_snapshot(path: str = SNAPSHOT_PATH) -> Optional[Tuple[pd.DataFrame, Dict[str, Any]]]:
+    """(ข้อมูลที่เตรียมแล้ว, meta) จาก snapshot หรือ None เมื่อไม่มีไฟล์/อ่านไม่ได้"""
+    if pa is None or not os.path.exists(path):
+        return None
+    try:
+        table = feather.read_table(path, memory_map=True)
+    except (OSError, pa.ArrowInvalid):
+        return None
+    raw_meta = (table.schema.metadata or {}).get(_META_KEY, b'{}')
+    # ข้อความอิสระกลับมาเป็นข้อความแบบ Arrow เหมือนตอนเตรียมข้อมูล (ไม่แตกเป็น Python object)
+    frame = table.to_pandas(types_mapper={pa.string(): pd.StringDtype('pyarrow')}.get)
+    return frame, json.loads(raw_meta.decode('utf-8'))
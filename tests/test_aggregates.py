@@ -0,0 +1,97 @@
+import math
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregates import CUBE_FLAG_COLS, ROWS_COL, TREND_FREQS, build_cube, build_trend, compare_levels, merge_trend
+from ingest import prepare_frame
+from synthetic import generate_responses
+
+
+@pytest.fixture(scope='module')
+def frame():
+    df = prepare_frame(generate_responses(2000, n_wards=5, years=2, seed=7))
+    # หน่วยงานสุดท้ายอยู่ท้ายข้อมูลทั้งหมด: แถวใหม่บางชุดมีหน่วยงานที่ trend เดิมยังไม่มี
+    last = df['หน่วยงาน'].cat.categories[-1]
+    return pd.concat([df[df['หน่วยงาน'] != last], df[df['หน่วยงาน'] == last]], ignore_index=True)
+
+
+@pytest.mark.parametrize('freq', list(TREND_FREQS))
+@pytest.mark.parametrize('split', [1, 700, 1500, 1999])
+def test_merge_trend_matches_full_build(frame, freq, split):
+    old, new = frame.iloc[:split], frame.iloc[split:]
+    merged = merge_trend(build_trend(old, freq), build_trend(new, freq))
+    pd.testing.assert_frame_equal(merged, build_trend(frame, freq))
+
+
+@pytest.mark.parametrize('freq', list(TREND_FREQS))
+def test_merge_trend_over_repeated_appends(frame, freq):
+    trend = build_trend(frame.iloc[:0], freq)
+    for start in range(0, len(frame), 450):
+        trend = merge_trend(trend, build_trend(frame.iloc[start:start + 450], freq))
+    pd.testing.assert_frame_equal(trend, build_trend(frame, freq))
+
+
+def wilson(successes, n, z):
+    p = successes / n
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    half = z / denom * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n))
+    return center - half, center + half
+
+
+@pytest.fixture(scope='module')
+def small_frame():
+    df = prepare_frame(generate_responses(240, n_wards=4, years=1, seed=11))
+    score, flag = 'Q1_ความสะดวกการรับบริการ__score', CUBE_FLAG_COLS[0]
+    wards = df['หน่วยงาน'].cat.categories
+    none, one = (df['หน่วยงาน'] == wards[0]).to_numpy(), (df['หน่วยงาน'] == wards[1]).to_numpy()
+    single = one & (np.cumsum(one) == 1)
+    # หน่วยงานแรก: ไม่มีคำตอบเลย (n = 0), หน่วยงานที่สอง: มีคำตอบเดียว (n = 1)
+    df.loc[none | (one & ~single), score] = pd.NA
+    df.loc[none | (one & ~single), flag] = pd.NA
+    return df
+
+
+def test_wilson_reference_value():
+    low, high = wilson(8, 10, NormalDist().inv_cdf(0.975))
+    assert round(low, 4) == 0.4902 and round(high, 4) == 0.9433
+
+
+@pytest.mark.parametrize('confidence', [0.95, 0.9])
+def test_compare_levels_matches_groupby(small_frame, confidence):
+    df = small_frame
+    table = compare_levels(build_cube(df), ci=True, confidence=confidence)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    groups = df.groupby('หน่วยงาน', observed=True)
+    assert table[(ROWS_COL, 'n')].to_dict() == groups.size().to_dict()
+
+    score = 'Q1_ความสะดวกการรับบริการ__score'
+    for ward, values in groups[score]:
+        values = values.dropna().astype(float)
+        row = table.loc[ward, score]
+        assert row['n'] == len(values)
+        if len(values) == 0:
+            assert row[['mean', 'low', 'high']].isna().all()
+            continue
+        assert row['mean'] == pytest.approx(values.mean())
+        if len(values) == 1:
+            assert row[['low', 'high']].isna().all()
+            continue
+        half = z * values.std(ddof=1) / math.sqrt(len(values))
+        assert (row['low'], row['high']) == pytest.approx((values.mean() - half, values.mean() + half))
+
+    flag = CUBE_FLAG_COLS[0]
+    for ward, values in groups[flag]:
+        values = values.dropna().astype(bool)
+        row = table.loc[ward, flag]
+        assert row['n'] == len(values)
+        if len(values) == 0:
+            assert row[['mean', 'low', 'high']].isna().all()
+            continue
+        assert row['mean'] == pytest.approx(values.mean() * 100.0)
+        low, high = wilson(int(values.sum()), len(values), z)
+        assert (row['low'], row['high']) == pytest.approx((low * 100.0, high * 100.0))
+    assert {len(v.dropna()) for _, v in groups[score]} >= {0, 1}
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregates import filter_rows
+from comments import COMPLAINT_COL, CommentIndex, comment_rows, normalize_text, suggestion_column
+from ingest import prepare_frame
+from synthetic import generate_responses
+
+QUERIES = ['ห', 'น', 'i', 'รอ', 'WiFi', 'wifi', 'ค่าใช้จ่าย', 'สะอาด', 'ห้อง  น้ำ', 'ไม่ค่อยสะอาด',
+           'พยาบาลเวรดึก', 'ไม่มีคำนี้', 'zz']
+
+
+@pytest.fixture(scope='module')
+def frame():
+    raw = generate_responses(1200, n_wards=4, years=1, seed=5)
+    df = prepare_frame(raw)
+    # ข้อความที่ไม่อยู่ในชุดสุ่ม: ตัวพิมพ์ใหญ่/เล็กปนกัน และช่องว่างซ้ำ
+    extra = prepare_frame(raw.iloc[:4].assign(**{
+        next(c for c in raw.columns if c.startswith('(หากมี)')): ['ห้อง  น้ำไม่มี WIFI', 'รอนาน', 'ก', 'Wifi ช้า'],
+    }))
+    return pd.concat([df, extra], ignore_index=True)
+
+
+def brute_force(frame, within, query):
+    texts = frame[within.column].iloc[within.rows].map(normalize_text)
+    return within.rows[texts.str.contains(normalize_text(query), regex=False).to_numpy(dtype=bool)]
+
+
+def columns(frame):
+    return [COMPLAINT_COL, suggestion_column(frame)]
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_search_matches_brute_force(frame, query):
+    index = CommentIndex.build(frame)
+    for col in columns(frame):
+        for rows in (np.arange(len(frame)), filter_rows(frame, department=frame['หน่วยงาน'].iloc[0])):
+            within = comment_rows(frame, rows, col)
+            np.testing.assert_array_equal(index.search(frame, query, within).rows, brute_force(frame, within, query))
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_extended_index_matches_fresh_build(frame, query):
+    fresh = CommentIndex.build(frame)
+    index = CommentIndex.build(frame.iloc[:300])
+    for start, stop in [(300, 301), (301, 900), (900, len(frame))]:
+        index = index.extended(frame.iloc[:stop], start)
+    assert index.size == len(frame)
+    for col in columns(frame):
+        within = comment_rows(frame, np.arange(len(frame)), col)
+        np.testing.assert_array_equal(index.search(frame, query, within).rows,
+                                      fresh.search(frame, query, within).rows)
+
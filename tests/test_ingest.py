@@ -0,0 +1,259 @@
+import functools
+import http.server
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from ingest import (COLUMN_ALIASES, COLUMN_MAPPING, TIMESTAMP_COL, IncrementalLoader, MultiSourceLoader, merge_frames,
+                    prepare_frame, source_cache_path)
+from scoring import LIKERT_COLUMNS, score_column_name
+from snapshots import load_snapshot, save_snapshot
+from synthetic import generate_responses
+
+ROOT = Path(__file__).resolve().parent.parent
+WARD_COL = next(raw for raw, name in COLUMN_MAPPING.items() if name == 'หน่วยงาน')
+CHECK_COLS = ['date_col', 'หน่วยงาน', 'คะแนนความพึงพอใจ', 'รายละเอียดความไม่พึงพอใจ__has']
+
+
+@pytest.fixture(scope='module')
+def raw():
+    return generate_responses(300, n_wards=5, years=1, seed=1)
+
+
+def write(path, df):
+    df.to_csv(path, index=False)
+
+
+def assert_same_rows(frame, expected):
+    pd.testing.assert_frame_equal(frame[CHECK_COLS].reset_index(drop=True).astype(object),
+                                  expected[CHECK_COLS].reset_index(drop=True).astype(object))
+
+
+def fresh(source):
+    return IncrementalLoader(source).poll()
+
+
+@pytest.fixture
+def http_dir(tmp_path):
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=str(tmp_path))
+    handler.log_message = lambda *a: None
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield tmp_path, f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+
+
+def test_growth_loads_only_new_rows(tmp_path, raw):
+    path = str(tmp_path / 'form.csv')
+    write(path, raw.iloc[:200])
+    loader = IncrementalLoader(path)
+    assert len(loader.poll()) == 200
+    write(path, raw.iloc[:250])
+    frame = loader.poll()
+    assert loader.stats()['incremental'] == 1 and loader.appended_from == 200
+    assert_same_rows(frame, fresh(path))
+
+
+def test_growth_over_http(http_dir, raw):
+    root, base = http_dir
+    write(root / 'form.csv', raw.iloc[:200])
+    loader = IncrementalLoader(f'{base}/form.csv')
+    loader.poll()
+    write(root / 'form.csv', raw)
+    frame = loader.poll()
+    assert loader.stats() == {'full': 1, 'incremental': 1, 'unchanged': 0, 'rows': 300}
+    assert_same_rows(frame, fresh(str(root / 'form.csv')))
+    loader.poll()  # เนื้อหาเท่าเดิมทุกไบต์: ไม่ parse
+    assert loader.stats()['unchanged'] == 1
+
+
+def test_edit_of_earlier_row_reloads(tmp_path, raw):
+    path = str(tmp_path / 'form.csv')
+    write(path, raw.iloc[:200])
+    loader = IncrementalLoader(path)
+    loader.poll()
+    edited = raw.copy()
+    edited.loc[10, WARD_COL] = 'หอผู้ป่วยแก้ไข'
+    write(path, edited.iloc[:250])
+    frame = loader.poll()
+    assert loader.stats()['full'] == 2 and loader.appended_from is None
+    assert frame['หน่วยงาน'].iloc[10] == 'หอผู้ป่วยแก้ไข'
+    assert_same_rows(frame, fresh(path))
+
+
+def test_edit_detected_after_restore(tmp_path, raw):
+    path = str(tmp_path / 'form.csv')
+    write(path, raw.iloc[:200])
+    first = IncrementalLoader(path)
+    first.poll()
+    edited = raw.copy()
+    edited.loc[10, WARD_COL] = 'หอผู้ป่วยแก้ไข'
+    write(path, edited.iloc[:250])
+    loader = IncrementalLoader(path)
+    loader.restore(first.frame, first.state())
+    frame = loader.poll()
+    assert loader.stats()['full'] == 1
+    assert frame['หน่วยงาน'].iloc[10] == 'หอผู้ป่วยแก้ไข'
+
+
+def test_shrink_reloads(tmp_path, raw):
+    path = str(tmp_path / 'form.csv')
+    write(path, raw.iloc[:200])
+    loader = IncrementalLoader(path)
+    loader.poll()
+    write(path, raw.iloc[:150])
+    frame = loader.poll()
+    assert loader.stats()['full'] == 2 and len(frame) == 150
+    assert_same_rows(frame, fresh(path))
+
+
+def test_unchanged_file_is_not_read(tmp_path, raw):
+    path = str(tmp_path / 'form.csv')
+    write(path, raw.iloc[:200])
+    loader = IncrementalLoader(path)
+    frame = loader.poll()
+    assert loader.poll() is frame
+    assert loader.stats() == {'full': 1, 'incremental': 0, 'unchanged': 1, 'rows': 200}
+    write(path, raw.iloc[:200])  # เขียนทับด้วยเนื้อหาเดิม: mtime เปลี่ยนแต่ไม่ต้อง parse
+    assert loader.poll() is frame
+    assert loader.stats()['unchanged'] == 2
+
+
+COMPLAINT_RAW = next(raw for raw, name in COLUMN_MAPPING.items() if name == 'รายละเอียดความไม่พึงพอใจ')
+
+
+def merged_fresh(paths):
+    return merge_frames([fresh(p) for p in paths])[0]
+
+
+def test_multi_source_append_matches_full_merge(tmp_path, raw):
+    # ชีตปีปัจจุบันไม่มีคอลัมน์ความคิดเห็น: flag ของแถวที่ต่อท้ายต้องเป็น False ไม่ใช่ NaN → True
+    old, live = str(tmp_path / 'old.csv'), str(tmp_path / 'live.csv')
+    write(old, raw.iloc[:150])
+    current = raw.iloc[150:].drop(columns=[COMPLAINT_RAW])
+    write(live, current.iloc[:50])
+    loader = MultiSourceLoader([old, live])
+    loader.poll()
+    write(live, current)
+    frame = loader.poll()
+    assert loader.appended_from == 200
+    flag = frame['รายละเอียดความไม่พึงพอใจ__has']
+    assert flag.dtype == bool and not flag.iloc[150:].any()
+    assert_same_rows(frame, merged_fresh([old, live]))
+
+
+def test_multi_source_drops_duplicate_responses(tmp_path, raw):
+    # คำตอบที่อยู่ทั้งในไฟล์ export ปีก่อนและชีตปัจจุบันนับครั้งเดียว ทั้งตอนรวมครั้งแรกและตอนต่อท้าย
+    old, live = str(tmp_path / 'old.csv'), str(tmp_path / 'live.csv')
+    write(old, raw.iloc[:150])
+    write(live, raw.iloc[100:200])
+    loader = MultiSourceLoader([old, live])
+    assert len(loader.poll()) == 200
+    write(live, pd.concat([raw.iloc[100:200], raw.iloc[120:150], raw.iloc[200:]]))
+    frame = loader.poll()
+    assert loader.appended_from == 200 and len(frame) == 300
+    assert_same_rows(frame, merged_fresh([old, live]))
+
+
+def historical_headers(df):
+    # หัวคอลัมน์แบบไฟล์ export ปีก่อน ๆ (เช่น mpxi1.xlsx)
+    legacy = {}
+    for alias, name in COLUMN_ALIASES.items():
+        current = next((raw for raw, n in COLUMN_MAPPING.items() if n == name), None)
+        if current in df.columns and current not in legacy:
+            legacy[current] = alias
+    return df.rename(columns=legacy)
+
+
+def test_xlsx_export_overlapping_csv_is_deduplicated(tmp_path, raw):
+    # xlsx เก็บเวลาถึงมิลลิวินาที CSV ของชีตละเอียดถึงวินาที: คำตอบเดียวกันต้องนับครั้งเดียว
+    export = raw.iloc[:150].copy()
+    stamps = pd.to_datetime(export[TIMESTAMP_COL], format='%d/%m/%Y %H:%M:%S')
+    export[TIMESTAMP_COL] = stamps + pd.to_timedelta(range(150), unit='ms') + pd.Timedelta('381ms')
+    # อีกคำตอบจากหอผู้ป่วยเดียวกันในวินาทีเดียวกัน (คนละคำตอบ): ไม่ถูกตัด
+    twin = export.iloc[[0]].assign(**{TIMESTAMP_COL: export[TIMESTAMP_COL].iloc[0] + pd.Timedelta('500ms')})
+    old, live = str(tmp_path / 'old.xlsx'), str(tmp_path / 'live.csv')
+    pd.concat([export, twin]).to_excel(old, index=False)
+    write(live, raw.iloc[100:200])
+    loader = MultiSourceLoader([old, live])
+    assert len(loader.poll()) == 201
+    write(live, raw.iloc[100:])
+    frame = loader.poll()
+    assert loader.appended_from == 201 and len(frame) == 301
+    assert_same_rows(frame, merged_fresh([old, live]))
+
+
+def test_historical_headers_map_to_current_columns(raw):
+    expected = prepare_frame(raw.iloc[:100])
+    frame = prepare_frame(historical_headers(raw.iloc[:100]))
+    assert frame.columns.is_unique and set(expected.columns) <= set(frame.columns)
+    cols = CHECK_COLS + ['ความพึงพอใจโดยรวม', 'Q1_ความสะดวกการรับบริการ', 'ความคาดหวังต่อบริการ__has']
+    pd.testing.assert_frame_equal(frame[cols].astype(object), expected[cols].astype(object))
+
+
+def test_current_and_historical_headers_are_coalesced(raw):
+    # ไฟล์ที่มีทั้งหัวคอลัมน์ปัจจุบันและหัวคอลัมน์เก่าของคำถามเดียวกัน: ได้คอลัมน์เดียว ค่าปัจจุบันมาก่อน
+    q1 = next(raw_col for raw_col, name in COLUMN_MAPPING.items() if name == 'Q1_ความสะดวกการรับบริการ')
+    df = raw.iloc[:100].copy()
+    df[historical_headers(df[[q1]]).columns[0]] = df[q1]
+    df.loc[:49, q1] = None
+    frame = prepare_frame(df)
+    assert frame.columns.is_unique
+    expected = prepare_frame(raw.iloc[:100])
+    pd.testing.assert_series_equal(frame['Q1_ความสะดวกการรับบริการ'], expected['Q1_ความสะดวกการรับบริการ'])
+
+
+def test_historical_export_scores_every_answer():
+    # mpxi1.xlsx: หัวคอลัมน์แบบเก่า และข้อ 1, 3, 5, 7-10 ตอบด้วยคำเฉพาะของข้อ (สะดวกมาก, ชัดเจนดี, เหมาะสม ...)
+    frame = prepare_frame(pd.read_excel(ROOT / 'mpxi1.xlsx'))
+    for col in LIKERT_COLUMNS:
+        assert frame[score_column_name(col)].notna().sum() == 61, col
+    q1 = frame[score_column_name('Q1_ความสะดวกการรับบริการ')]
+    assert q1.value_counts().to_dict() == {5: 42, 4: 17, 3: 2}
+    q7 = frame[score_column_name('Q7_ข้อมูลค่าใช้จ่าย')]
+    assert q7.value_counts().to_dict() == {5: 38, 4: 21, 3: 1, 2: 1}
+    assert round(q1.mean(), 2) == 4.66
+
+
+def test_source_cache_skips_parse_after_restart(tmp_path, raw):
+    old, live = str(tmp_path / 'old.csv'), str(tmp_path / 'live.csv')
+    write(old, raw.iloc[:150])
+    write(live, raw.iloc[150:])
+    cache = str(tmp_path / 'cache')
+    first = MultiSourceLoader([old, live], cache_dir=cache)
+    expected = first.poll()
+    cached = {p: os.stat(source_cache_path(cache, p)).st_mtime_ns for p in (old, live)}
+    loader = MultiSourceLoader([old, live], cache_dir=cache)
+    assert_same_rows(loader.poll(), expected)
+    assert loader.stats()['full'] == 0 and loader.stats()['unchanged'] == 2
+    # แหล่งที่ไม่เปลี่ยนไม่ต้องเขียน cache ใหม่
+    assert {p: os.stat(source_cache_path(cache, p)).st_mtime_ns for p in (old, live)} == cached
+
+
+def test_source_cache_of_older_prepare_version_is_ignored(tmp_path, raw):
+    path = str(tmp_path / 'old.csv')
+    write(path, raw.iloc[:150])
+    cache = str(tmp_path / 'cache')
+    MultiSourceLoader([path, path + '.missing'], cache_dir=cache).poll()
+    frame, meta = load_snapshot(source_cache_path(cache, path))
+    save_snapshot(frame, {**meta, 'version': meta['version'] - 1}, source_cache_path(cache, path))
+    loader = MultiSourceLoader([path, path + '.missing'], cache_dir=cache)
+    loader.poll()
+    assert loader.stats()['full'] == 1
+
+
+def test_failed_source_keeps_its_previous_rows(tmp_path, raw):
+    old, live = str(tmp_path / 'old.csv'), str(tmp_path / 'live.csv')
+    write(old, raw.iloc[:150])
+    write(live, raw.iloc[150:])
+    loader = MultiSourceLoader([old, live])
+    loader.poll()
+    (tmp_path / 'old.csv').unlink()
+    frame = loader.poll()
+    assert list(loader.errors) == [old] and len(frame) == 300
+    write(old, raw.iloc[:150])
+    loader.poll()
+    assert loader.errors == {}
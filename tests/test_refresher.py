@@ -0,0 +1,32 @@
+from compute import FilterSpec
+from refresher import SnapshotRefresher
+from synthetic import generate_responses
+
+
+def test_unchanged_source_keeps_memoized_results(tmp_path):
+    path = str(tmp_path / 'form.csv')
+    generate_responses(200, n_wards=5, years=1, seed=1).to_csv(path, index=False)
+    refresher = SnapshotRefresher(path)
+    first = refresher.refresh_once()
+    first.dashboard(FilterSpec())
+    first.compare(FilterSpec())
+    second = refresher.refresh_once()
+    assert second.results is first.results and len(second.results) == 1
+    assert second.comparisons is first.comparisons
+    assert second.loaded_at >= first.loaded_at
+
+
+def test_partial_source_failure_is_reported(tmp_path):
+    old, live = str(tmp_path / 'old.csv'), str(tmp_path / 'live.csv')
+    raw = generate_responses(200, n_wards=5, years=1, seed=1)
+    raw.iloc[:100].to_csv(old, index=False)
+    raw.iloc[100:].to_csv(live, index=False)
+    refresher = SnapshotRefresher([old, live])
+    assert refresher.refresh_once().source_errors == {}
+    (tmp_path / 'old.csv').unlink()
+    snap = refresher.refresh_once()
+    assert not snap.is_fallback and len(snap.frame) == 200
+    assert list(snap.source_errors) == [old] and old in snap.error
+    raw.iloc[:100].to_csv(old, index=False)
+    snap = refresher.refresh_once()
+    assert snap.source_errors == {} and snap.error is None
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from aggregates import build_cube, filter_rows
+from ingest import prepare_frame
+from report import OVERALL, PERIODS, export_reports, report_periods, report_rows, write_index
+from synthetic import generate_responses
+
+
+@pytest.fixture(scope='module')
+def frame():
+    return prepare_frame(generate_responses(1500, n_wards=4, years=2, seed=3))
+
+
+@pytest.mark.parametrize('period', list(PERIODS))
+def test_report_rows_match_filter_rows(frame, period):
+    cube = build_cube(frame)
+    rows = report_rows(frame, period)
+    for department in [None] + list(frame['หน่วยงาน'].cat.categories):
+        for _, _, spec in report_periods(cube, period):
+            expected = filter_rows(frame, department=department, **spec)
+            got = rows.get((department, tuple(spec.values())), np.empty(0, dtype=np.intp))
+            assert np.array_equal(got, expected), (department, spec)
+
+
+def test_export_counts_match_filters(frame, tmp_path):
+    entries = export_reports(frame, str(tmp_path), period='year', formats=['xlsx'], workers=1)
+    assert entries
+    for e in entries:
+        department = None if e['department'] == OVERALL else e['department']
+        assert e['responses'] == len(filter_rows(frame, department=department, year=int(e['period'])))
+
+
+def test_index_shows_missing_average_as_na(tmp_path):
+    entries = [{'department': OVERALL, 'period': '2025-01', 'title': 'ม.ค. 2025', 'responses': 12,
+                'avg': 4.256, 'files': []},
+               {'department': 'หอผู้ป่วย ก', 'period': '2025-01', 'title': 'ม.ค. 2025', 'responses': 3,
+                'avg': float('nan'), 'files': []}]
+    page = open(write_index(str(tmp_path), entries, 'form.csv', '2025-02-01'), encoding='utf-8').read()
+    assert '<td>4.26</td>' in page and '<td>N/A</td>' in page and 'nan' not in page
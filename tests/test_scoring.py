@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scoring import LIKERT_COLUMNS, normalize_to_1_5, score_likert_columns
+
+# คำตอบที่พบในไฟล์ export: ข้อความ (มีช่องว่างนำหน้า/คำเฉพาะข้อ), ตัวเลข, ตัวเลขเป็นข้อความ และค่าว่างหลายแบบ
+ANSWERS = ['มากที่สุด', ' มาก', 'ปานกลาง', 'น้อย', 'น้อยมาก', 'สะดวกมาก', 'ชัดเจนดี', 'ไม่ชัดเจนเลย',
+           '5', '4.0', 'คะแนน 3', 'อื่น ๆ', 5, 4, 3.0, 2, 1, 0, 7, True, None, np.nan, pd.NA]
+
+
+def score_with_apply(df):
+    return pd.DataFrame({f'{c}__score': df[c].apply(normalize_to_1_5).astype('Float64') for c in df.columns},
+                        index=df.index)
+
+
+def assert_matches_apply(df):
+    pd.testing.assert_frame_equal(score_likert_columns(df).astype('Float64'), score_with_apply(df))
+
+
+def test_mixed_columns_match_apply():
+    rng = np.random.default_rng(0)
+    answers = np.array(ANSWERS, dtype=object)
+    assert_matches_apply(pd.DataFrame({c: answers[rng.integers(0, len(answers), 500)] for c in LIKERT_COLUMNS}))
+
+
+@pytest.mark.parametrize('values', [
+    [5, 4, 3, 2, 1, 5],                               # int ล้วน
+    [5.0, 4.0, np.nan, 1.0, 3.0, np.nan],             # float มี NaN (คอลัมน์ตัวเลขที่มีช่องว่าง)
+    ['มาก', 'มากที่สุด', None, 'น้อย', ' มาก', ''],    # ข้อความล้วน
+    [5, '5', 5.0, 'มาก', np.nan, None],               # int/str/float/NaN ปนกัน
+    [1, True, '1', 1.0, pd.NA, 'น้อยมาก'],             # ค่าที่ == กันแต่ str() ไม่เท่ากัน
+    [None, None, np.nan, pd.NA, None, None],          # ว่างทั้งคอลัมน์
+])
+def test_column_kinds_match_apply(values):
+    df = pd.DataFrame({LIKERT_COLUMNS[0]: pd.Series(values, dtype=object),
+                       LIKERT_COLUMNS[1]: pd.Series(values[::-1], dtype=object)})
+    assert_matches_apply(df)
+    assert_matches_apply(df.infer_objects())
+
+
+def test_missing_columns_are_skipped():
+    df = pd.DataFrame({LIKERT_COLUMNS[0]: ['มาก', None], 'อื่น': [1, 2]}, index=[10, 20])
+    scores = score_likert_columns(df)
+    assert list(scores.columns) == [f'{LIKERT_COLUMNS[0]}__score'] and list(scores.index) == [10, 20]